@@ -4,23 +4,35 @@ import os
 import uuid
 from datetime import datetime
 import boto3
+from boto3.dynamodb.conditions import Key
 import requests # Requires Lambda Layer: used for simulating external API calls
-import decimal # Add this import at the top
-
-# Add this class definition below your imports:
-class DecimalEncoder(json.JSONEncoder):
-    """Custom JSON encoder to handle Decimal types from DynamoDB."""
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            # Check if it's an integer and return int, otherwise float
-            return int(o) if o == int(o) else float(o)
-        return super(DecimalEncoder, self).default(o)
+import heapq
+from civicbot_utils.bulk_read import parallel_scan # Requires CivicBot Utilities Layer
+from civicbot_utils.messages import format_status_message, status_not_found_message, rating_feedback, REPORT_LIMIT_MESSAGE
+from civicbot_utils.admission import AdmissionController
+from civicbot_utils import status_cache
+from civicbot_utils.priority import build_priority_prompt, parse_priority, FALLBACK_PRIORITY, PROMPT_VERSION
+from civicbot_utils.classification import PENDING_PRIORITY, get_classification_queue
+from civicbot_utils import similarity
+from civicbot_utils.status_shards import status_shard_key
+from civicbot_utils.archive import load_issue
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.serialization import dumps
+from civicbot_utils.http_pool import boto_config
 
 # --- CONFIGURATION (MUST BE UPDATED) ---
 REGION = 'us-east-1' # N. Virginia
 DYNAMODB_ISSUES_TABLE = 'CivicIssues' # <-- VERIFY
 DYNAMODB_SESSIONS_TABLE = 'UserSessions' # <-- VERIFY
+USER_ISSUES_INDEX = 'UserID-Timestamp-index' # GSI on CivicIssues: UserID (PK) + Timestamp (SK)
+MY_REPORTS_LIMIT = 5
 S3_BUCKET_NAME = 'civicbot-media-reports'
+# When true, reports are saved as PENDING and classified by the PriorityClassifier worker.
+# Requires CLASSIFICATION_QUEUE_URL: the in-memory queue is only for offline tests/benchmarks.
+ASYNC_CLASSIFICATION = (
+    os.environ.get('ASYNC_CLASSIFICATION', 'false').lower() == 'true'
+    and bool(os.environ.get('CLASSIFICATION_QUEUE_URL'))
+)
 # SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:123456789012:HighPriorityAlert' 
 # The SNS line above is now COMMENTED OUT for Lex testing.
 
@@ -28,10 +40,12 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb', region_name=REGION)
-bedrock_rt = boto3.client('bedrock-runtime', region_name=REGION)
+dynamodb = boto3.resource('dynamodb', region_name=REGION, config=boto_config())
+bedrock_rt = boto3.client('bedrock-runtime', region_name=REGION, config=boto_config())
 # sns_client = boto3.client('sns', region_name=REGION) # SNS Client commented out
-translate_client = boto3.client('translate', region_name=REGION) 
+translate_client = boto3.client('translate', region_name=REGION, config=boto_config()) 
+# Per-WaId 'report' bucket; shares ADMISSION_REDIS_URL / ADMISSION_TABLE with WhatsApp_Connector
+admission = AdmissionController()
 
 # --- HELPER FUNCTIONS ---
 
@@ -42,12 +56,6 @@ def get_slot_value(slots, slot_name):
     except AttributeError:
         return None
 
-import json
-import decimal # Must be imported at the top
-
-import json
-import decimal
-
 def handle_welcome_intent(intent_request):
     """
     Handles the WelcomeIntent. Since the menu message is set in Lex's Initial Response,
@@ -56,6 +64,63 @@ def handle_welcome_intent(intent_request):
     """
     # NOTE: The actual menu is defined in the Lex Console.
     return close_dialog(intent_request, 'Fulfilled', 'Displaying main menu.')
+def issue_matches(item, search_keyword, search_location):
+    """Non-AI keyword match used by RetrieveID (lower-cased search terms)."""
+    db_issue = item.get('IssueType', '').lower()
+    db_location = item.get('UserLocation', '').lower()
+    
+    # Check if the user's issue description is contained in the stored DB issue text:
+    issue_match = all(word in db_issue for word in search_keyword.split()) 
+    
+    # Check if the user's location keyword is contained in the stored DB location text:
+    location_match = (search_location in db_location)
+    
+    return issue_match and location_match
+
+def iter_user_issues(issues_table, wa_id, limit=None):
+    """Yields a citizen's reports newest first from the UserID-Timestamp index (paginated)."""
+    kwargs = {
+        'IndexName': USER_ISSUES_INDEX,
+        'KeyConditionExpression': Key('UserID').eq(wa_id),
+        'ScanIndexForward': False
+    }
+    if limit:
+        kwargs['Limit'] = limit
+    returned = 0
+    while True:
+        response = issues_table.query(**kwargs)
+        for item in response.get('Items', []):
+            yield item
+            returned += 1
+            if limit and returned >= limit:
+                return
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def handle_my_reports(intent_request):
+    """Lists the caller's most recent reports (sessionId is the WhatsApp WaId)."""
+    wa_id = intent_request.get('sessionId')
+    if not wa_id:
+        return close_dialog(intent_request, 'Failed', "I couldn't identify your number to look up your reports.")
+
+    try:
+        issues_table = dynamodb.Table(DYNAMODB_ISSUES_TABLE)
+        reports = list(iter_user_issues(issues_table, wa_id, limit=MY_REPORTS_LIMIT))
+    except Exception as e:
+        logger.error(f"My reports lookup failed: {e}")
+        return close_dialog(intent_request, 'Failed', "An internal error occurred while fetching your reports.")
+
+    if not reports:
+        return close_dialog(intent_request, 'Fulfilled', "You have not reported any issues yet. Reply 'Report Issue' to file one.")
+
+    lines = [
+        f"*{report['IssueID']}* - {report.get('IssueType', 'N/A')} ({report.get('Status', 'N/A')})"
+        for report in reports
+    ]
+    message = f"📋 *Your recent reports:*\n\n" + "\n".join(lines) + "\n\nSend an ID to see its full status."
+    return close_dialog(intent_request, 'Fulfilled', message)
+
 def handle_retrieve_id(intent_request):
     """
     Handles forgotten Issue ID retrieval using only robust keyword filtering 
@@ -76,27 +141,28 @@ def handle_retrieve_id(intent_request):
         search_location = user_location.lower().strip()
         
         issues_table = dynamodb.Table(DYNAMODB_ISSUES_TABLE)
-        response = issues_table.scan()
-        items = response.get('Items', [])
+        matches = lambda item: issue_matches(item, search_keyword, search_location)
         
+        # --- 1a. The caller's own reports first: a single-partition query on the UserID index ---
         found_reports = []
+        wa_id = intent_request.get('sessionId')
+        if wa_id:
+            own_match = next((item for item in iter_user_issues(issues_table, wa_id) if matches(item)), None)
+            if own_match:
+                found_reports.append(own_match)
         
-        for item in items:
-            db_issue = item.get('IssueType', '').lower()
-            db_location = item.get('UserLocation', '').lower()
-            
-            # Non-AI Search: Check if any major search term is contained in the stored issue/location text.
-            # This is a robust keyword check that simulates similarity.
-            
-            # Check if the user's issue description is contained in the stored DB issue text:
-            issue_match = all(word in db_issue for word in search_keyword.split()) 
-            
-            # Check if the user's location keyword is contained in the stored DB location text:
-            location_match = (search_location in db_location)
-            
-            if issue_match and location_match:
-                found_reports.append(item)
-                break # Found the closest match
+        # --- 1b. Global search only if the caller has no matching report ---
+        if not found_reports:
+            # Parallel, fully paginated scan; breaking out of the loop stops the remaining segments
+            items = parallel_scan(
+                issues_table,
+                ProjectionExpression='IssueID, IssueType, UserLocation, #s',
+                ExpressionAttributeNames={'#s': 'Status'}
+            )
+            for item in items:
+                if matches(item):
+                    found_reports.append(item)
+                    break # Found the closest match
             
         # --- 2. RESPONSE ---
         if found_reports:
@@ -121,22 +187,16 @@ def handle_retrieve_id(intent_request):
         logger.error(f"ID Retrieval (Non-AI) failed: {e}")
         return close_dialog(intent_request, 'Failed', "An internal error occurred during the database search.")
 def get_issue_priority(issue_text):
-    """Uses Bedrock (Titan Text Express) with the simplest possible prompt structure."""
+    """
+    Uses Bedrock (Titan Text Express) with the simplest possible prompt structure.
+    Returns (priority, prompt_version); prompt_version is None when MEDIUM is only the fallback,
+    so the reprioritize backfill still picks the issue up.
+    """
     try:
-        # --- 1. ATOMIC INSTRUCTION PROMPT ---
-        # Instruction is flattened to one line to eliminate newline errors.
-        prompt_instruction = (
-            "Classify the following issue as one word: HIGH, MEDIUM, or LOW. "
-            "HIGH is for health/safety crises (e.g., sewage leak, road collapse). "
-            "MEDIUM is for non-critical safety/service (e.g., flickering light, minor debris). "
-            "LOW is for aesthetic/maintenance only (e.g., faded paint, small weeds). "
-            f"Issue: {issue_text} Priority:"
-        )
+        # --- 1. ATOMIC INSTRUCTION PROMPT (shared with the re-prioritization backfill) ---
+        titan_input_text = build_priority_prompt(issue_text)
         
-        # --- 2. CRITICAL FIX: ENFORCE PREFIXING WITHOUT COMPLEX F-STRINGS ---
-        titan_input_text = "User: " + prompt_instruction.strip() + " Assistant:"
-        
-        # --- 3. INVOKE MODEL ---
+        # --- 2. INVOKE MODEL ---
         response = bedrock_rt.invoke_model(
             modelId='amazon.titan-text-express-v1',
             contentType='application/json',
@@ -151,39 +211,22 @@ def get_issue_priority(issue_text):
             })
         )
         
-        # --- 4. NEW PARSING LOGIC: Extract the first word ---
+        # --- 3. NEW PARSING LOGIC: Extract the first word ---
         response_body = json.loads(response.get('body').read())
         
         # The LLM is asked to output only the priority word, so we grab the first word.
-        priority_word = response_body.get('results', [{}])[0].get('outputText', 'MEDIUM').split()[0].upper().strip()
-        
-        return priority_word if priority_word in ['HIGH', 'MEDIUM', 'LOW'] else 'MEDIUM'
+        priority = parse_priority(response_body.get('results', [{}])[0].get('outputText', ''), default=None)
+        if priority is None:
+            return FALLBACK_PRIORITY, None
+        return priority, PROMPT_VERSION
         
     except Exception as e:
         # This will now only catch critical failures outside the API call itself.
         logger.error(f"Bedrock priority classification failed: {e}")
-        return 'MEDIUM'
+        return FALLBACK_PRIORITY, None
 def get_similar_issues(issue_text):
-    """Uses Titan Embeddings for vector search simulation (Feature 7)."""
-    try:
-        # Note: This step requires a live Vector DB (e.g., OpenSearch) for a full RAG system.
-        # Here, we only test the ability to call the Titan Embeddings model.
-        
-        bedrock_rt.invoke_model(
-            modelId='amazon.titan-embed-text-v1',
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({"inputText": issue_text})
-        )
-        # If the model call succeeds, we simulate finding a match
-        if "pothole" in issue_text.lower() and "main street" in issue_text.lower():
-             return ["A similar Pothole report (ID: 12345) found nearby. Upvote instead?"]
-             
-        return []
-        
-    except Exception as e:
-        logger.error(f"Bedrock embedding model call succeeded but search is simulated: {e}")
-        return []
+    """Uses Titan Embeddings for vector search simulation (Feature 7). Shared with the PriorityClassifier worker."""
+    return similarity.get_similar_issues(bedrock_rt, issue_text)
         
 def get_contextual_suggestion(issue_type):
     """Simulates Feature 9: Context-Aware Suggestions (using simple logic)."""
@@ -200,9 +243,9 @@ def generate_admin_summary(timeframe, report_type):
     """Uses Bedrock (Nova Premier) for complex data synthesis (Feature 10)."""
     try:
         issues_table = dynamodb.Table(DYNAMODB_ISSUES_TABLE)
-        # Fetch mock data (or real data if available)
-        response = issues_table.scan(Limit=10) # Fetch recent 10 items for a small demo
-        issue_data = json.dumps(response.get('Items', []), cls=DecimalEncoder)
+        # Keep only the 10 most recent reports to bound the prompt size
+        recent_items = heapq.nlargest(10, parallel_scan(issues_table), key=lambda i: i.get('Timestamp', 0))
+        issue_data = dumps(recent_items)
 
         # Update the 'prompt' variable inside generate_admin_summary
         prompt = f"""TASK: As a data analyst, summarize the following JSON data of civic reports for {timeframe}. Instructions: 
@@ -261,12 +304,24 @@ def handle_report_issue(intent_request):
     if not issue_type_slot:
          return close_dialog(intent_request, 'Failed', 'Error: Please provide a description of the issue.')
 
+    # Charged here, where the issue is created, however the user phrased the report
+    if wa_id and not admission.admit_user(wa_id, 'report'):
+        logger.info(f"Report limit reached for WaId: {wa_id}")
+        return close_dialog(intent_request, 'Failed', REPORT_LIMIT_MESSAGE)
+
     # --- 2. AI PROCESSING ---
-    priority = get_issue_priority(issue_type_slot)
-    similar_issues = get_similar_issues(issue_type_slot) # Community Validation check
+    if ASYNC_CLASSIFICATION:
+        # Confirm immediately; the queue-fed worker fills in the priority and runs the similarity check
+        priority, prompt_version = PENDING_PRIORITY, None
+        similar_issues = []
+    else:
+        priority, prompt_version = get_issue_priority(issue_type_slot)
+        similar_issues = get_similar_issues(issue_type_slot) # Community Validation check
     
     if similar_issues:
         msg_core = f"A similar issue was found nearby: {similar_issues[0]}. We'll link your report to it to avoid duplicates."
+    elif priority == PENDING_PRIORITY:
+        msg_core = "Thank you for reporting. We'll check it against nearby reports and link it if it is a duplicate."
     else:
         msg_core = "Thank you for reporting. Your issue is new."
         
@@ -275,16 +330,43 @@ def handle_report_issue(intent_request):
     issues_table = dynamodb.Table(DYNAMODB_ISSUES_TABLE)
     
     # Save the complete, structured report to DynamoDB
-    issues_table.put_item(Item={
+    issue_item = {
         'IssueID': issue_id,
         'Timestamp': int(datetime.now().timestamp()),
         'UserLocation': final_location,  # <-- ATTACHED LOCATION HERE
         'IssueType': issue_type_slot,
         'Priority': priority,
         'Status': 'New',
+        'StatusShard': status_shard_key('New', issue_id), # Spreads the status GSI over shards
         'ExpectedCompletionDate': 'Under Review', # Default for new reports
         'UserID': wa_id
-    })
+    }
+    if prompt_version:
+        issue_item['PriorityPromptVersion'] = prompt_version # Lets `reprioritize --all` skip current classifications
+    if similar_issues:
+        issue_item['SimilarIssues'] = similar_issues # Same attribute the PriorityClassifier worker writes
+    issues_table.put_item(Item=issue_item)
+    if priority == PENDING_PRIORITY:
+        try:
+            get_classification_queue().send({'IssueID': issue_id, 'IssueType': issue_type_slot})
+        except Exception as e:
+            # Never leave a report stuck at PENDING: classify inline instead
+            logger.error(f"Classification enqueue failed for {issue_id}, classifying inline: {e}")
+            priority, prompt_version = get_issue_priority(issue_type_slot)
+            similar_issues = get_similar_issues(issue_type_slot)
+            update_expression = "SET Priority = :p"
+            values = {':p': priority}
+            if prompt_version:
+                update_expression += ", PriorityPromptVersion = :v"
+                values[':v'] = prompt_version
+            if similar_issues:
+                update_expression += ", SimilarIssues = :similar"
+                values[':similar'] = similar_issues
+            issues_table.update_item(
+                Key={'IssueID': issue_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=values
+            )
     if wa_id:
         sessions_table = dynamodb.Table(DYNAMODB_SESSIONS_TABLE)
         sessions_table.put_item(Item={
@@ -301,7 +383,7 @@ def handle_report_issue(intent_request):
         f"{msg_core}\n"
         f"*Issue:* {issue_type_slot}\n"
         f"*Location:* {final_location}\n"
-        f"*Priority:* {priority}\n"
+        f"*Priority:* {'Pending review' if priority == PENDING_PRIORITY else priority}\n"
         f"*Expected Resolution:* Under Review (Notification will be sent when scheduled)."
     )
 
@@ -349,36 +431,26 @@ def handle_track_status(intent_request):
     
     logger.info(f"Looking up status for ID: {tracking_id}")
     
-    # --- 2. Try to find the ID in DynamoDB ---
+    # --- 2. Try to find the ID (warm cache first, then DynamoDB, then the archive) ---
+    def load_status(issue_id):
+        item = load_issue(issue_id, issues_table) # Falls back to the archive for old Completed issues
+        return format_status_message(item) if item else None
+
     try:
-        response = issues_table.get_item(Key={'IssueID': tracking_id})
-        item = response.get('Item')
+        message = status_cache.get_status_message(tracking_id, load_status)
         
         # --- 3. Check if the item was found ---
-        if item:
+        if message:
             # SUCCESS: We found the item!
             logger.info(f"Successfully found item for ID: {tracking_id}")
             
-            # Format the user-friendly response
-            completion_date = item.get('ExpectedCompletionDate', 'Under Review')
-            message = (
-                f"🚨 *Civic Report Status* 🚨\n\n"
-                f"*ID:* {item['IssueID']}\n"
-                f"*Issue:* {item.get('IssueType', 'N/A')}\n"
-                f"*Current Status:* {item['Status'].upper()}\n"
-                f"*Priority:* {item.get('Priority', 'N/A')}\n"
-                f"*Expected Completion:* {completion_date}"
-            )
+            # Format the user-friendly response (shared with the WhatsApp_Connector fast path)
             return close_dialog(intent_request, 'Fulfilled', message)
         
         else:
             # FAILURE: ID was valid, but not in our database
             logger.warning(f"No item found for ID: {tracking_id}")
-            return close_dialog(
-                intent_request, 
-                'Failed', 
-                f"Sorry, I could not find a report with the ID **{tracking_id}**. Please double-check the ID."
-            )
+            return close_dialog(intent_request, 'Failed', status_not_found_message(tracking_id))
             
     except Exception as e:
         # FAILURE: A database error occurred
@@ -391,22 +463,8 @@ def handle_track_status(intent_request):
 def handle_rate_service(intent_request):
     """Handles service feedback and rating (Feature 8)."""
     rating = get_slot_value(intent_request['sessionState']['intent']['slots'], 'RatingScore')
-    
-    try:
-        rating_val = int(rating)
-    except (ValueError, TypeError):
-        return close_dialog(intent_request, 'Failed', "Please provide a valid numeric rating between 1 and 5.")
-
-    if 1 <= rating_val <= 5:
-        # In production, you would associate this rating with a specific issue ID/User ID.
-        feedback_msg = "Thank you for your feedback! Your rating helps us improve service quality."
-        if rating_val <= 2:
-            feedback_msg += " We are sorry the service was poor and will review this with the team."
-        
-        return close_dialog(intent_request, 'Fulfilled', feedback_msg)
-    else:
-        return close_dialog(intent_request, 'Failed', "Please rate service on a scale of 1 to 5.")
-
+    fulfillment_state, feedback_msg = rating_feedback(rating)
+    return close_dialog(intent_request, fulfillment_state, feedback_msg)
 
 def handle_admin_summary(intent_request):
     """Handles admin requests for data analysis (Feature 10)."""
@@ -449,6 +507,8 @@ def dispatch(intent_request):
         return handle_welcome_intent(intent_request) 
     elif intent_name == 'RetrieveID': 
         return handle_retrieve_id(intent_request)
+    elif intent_name == 'MyReports':
+        return handle_my_reports(intent_request)
     elif intent_name == 'ForgotIdTrigger' or intent_name == 'StartReport': 
         # Since these intents have NO SLOTS and are fulfilled entirely by Lex routing,
         # we delegate control back immediately, letting Lex execute the Next Step 
@@ -499,6 +559,7 @@ def close_dialog(intent_request, fulfillment_state, message):
 
 # --- MAIN HANDLER ---
 
+@profiled
 def lambda_handler(event, context):
     """
     The entry point for the Lambda function invoked by Amazon Lex V2.
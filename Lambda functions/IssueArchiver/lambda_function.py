@@ -0,0 +1,33 @@
+import json
+import os
+import logging
+import time
+import boto3
+from civicbot_utils.archive import ARCHIVE_INDEX_TABLE # Requires CivicBot Utilities Layer
+from civicbot_utils.archive_completed import run_archive
+from civicbot_utils.http_pool import boto_config
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# --- CONFIGURATION (Reads from Environment Variables) ---
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues')
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '30'))
+# --- END CONFIGURATION ---
+
+# --- Initialize Clients (outside handler for reuse) ---
+dynamodb = boto3.resource('dynamodb', config=boto_config())
+issues_table = dynamodb.Table(TABLE_NAME)
+index_table = dynamodb.Table(ARCHIVE_INDEX_TABLE)
+s3_client = boto3.client('s3', config=boto_config())
+
+@profiled
+def lambda_handler(event, context):
+    """Scheduled (EventBridge) job: moves issues Completed for more than ARCHIVE_AFTER_DAYS to the archive."""
+    days = int((event or {}).get('days', ARCHIVE_AFTER_DAYS))
+    # Stop between chunks before the Lambda timeout; the next scheduled run continues the backlog
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000 if context else None
+    totals = run_archive(issues_table, index_table, s3_client, days=days, deadline=deadline)
+    logger.info(f"Archive totals: {json.dumps(totals)}")
+    return {'statusCode': 200, 'body': json.dumps(totals)}
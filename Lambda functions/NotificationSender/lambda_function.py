@@ -0,0 +1,123 @@
+import json
+import os
+import time
+import logging
+import itertools
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from twilio.base.exceptions import TwilioRestException
+from civicbot_utils import outbox # Requires CivicBot Utilities Layer
+from civicbot_utils.http_pool import boto_config, get_twilio_client
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# --- CONFIGURATION (Reads from Environment Variables) ---
+TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '').strip()
+TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '').strip()
+TWILIO_WHATSAPP_NUMBER = os.environ.get('TWILIO_WHATSAPP_NUMBER', '').strip() # Twilio Sandbox Number
+SEND_CONCURRENCY = int(os.environ.get('NOTIFICATION_SEND_CONCURRENCY', '8'))
+SWEEP_LIMIT = int(os.environ.get('NOTIFICATION_SWEEP_LIMIT', '500')) # Rows per scheduled run; the rest wait for the next run
+METRICS_NAMESPACE = 'CivicBot/Notifications'
+# --- END CONFIGURATION ---
+
+# --- Initialize Clients (outside handler for reuse) ---
+dynamodb = boto3.resource('dynamodb', config=boto_config())
+outbox_table = dynamodb.Table(outbox.OUTBOX_TABLE)
+dead_letter_table = dynamodb.Table(outbox.DEAD_LETTER_TABLE)
+twilio_client = get_twilio_client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+send_executor = ThreadPoolExecutor(max_workers=SEND_CONCURRENCY)
+
+
+def is_permanent_failure(error):
+    """Twilio 4xx errors (bad number, unsubscribed recipient...) will never succeed; 429 is just throttling."""
+    return isinstance(error, TwilioRestException) and 400 <= (error.status or 0) < 500 and error.status != 429
+
+
+def deliver(issue_id, transition):
+    """Claims one outbox row and sends it. Returns (outcome, delivery_latency_ms or None)."""
+    item = outbox.claim(outbox_table, issue_id, transition)
+    if item is None:
+        return 'skipped', None # Not due yet, or another invocation holds the lease
+
+    try:
+        message = twilio_client.messages.create(
+            from_=TWILIO_WHATSAPP_NUMBER,
+            body=item['Message'],
+            to=item['Recipient']
+        )
+    except Exception as e:
+        state = outbox.mark_failed(outbox_table, dead_letter_table, item, e, permanent=is_permanent_failure(e))
+        logger.warning(f"Notification {issue_id}/{transition} attempt {item['Attempts']} failed ({state}): {e}")
+        return ('dead_lettered' if state == outbox.DEAD else 'retried'), None
+
+    outbox.mark_sent(outbox_table, item, message.sid)
+    logger.info(f"Notification {issue_id}/{transition} sent. Twilio SID: {message.sid}")
+    return 'sent', int(time.time() * 1000) - int(item['CreatedAt']) * 1000
+
+
+def record_metrics(trigger, outcomes, latencies, duration_ms):
+    """One CloudWatch Embedded Metric Format line per invocation (throughput = NotificationsSent per period)."""
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Trigger']],
+                'Metrics': [
+                    {'Name': 'NotificationsSent', 'Unit': 'Count'},
+                    {'Name': 'NotificationsRetried', 'Unit': 'Count'},
+                    {'Name': 'NotificationsDeadLettered', 'Unit': 'Count'},
+                    {'Name': 'DeliveryLatencyMs', 'Unit': 'Milliseconds'},
+                    {'Name': 'BatchDurationMs', 'Unit': 'Milliseconds'}
+                ]
+            }]
+        },
+        'Trigger': trigger,
+        'NotificationsSent': outcomes.count('sent'),
+        'NotificationsRetried': outcomes.count('retried'),
+        'NotificationsDeadLettered': outcomes.count('dead_lettered'),
+        'DeliveryLatencyMs': latencies,
+        'BatchDurationMs': round(duration_ms, 1)
+    }))
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    Two triggers:
+      - the outbox table's DynamoDB Stream (INSERT): first delivery attempt, seconds after the change
+      - an EventBridge schedule (e.g. rate(1 minute)): retries whose backoff has expired and expired leases
+    """
+    started = time.perf_counter()
+    records = (event or {}).get('Records')
+    if records:
+        trigger = 'stream'
+        keys = [
+            (record['dynamodb']['Keys']['IssueID']['S'], record['dynamodb']['Keys']['Transition']['S'], record['dynamodb']['SequenceNumber'])
+            for record in records if record['eventName'] == 'INSERT'
+        ]
+    else:
+        trigger = 'schedule'
+        keys = [(issue_id, transition, None) for issue_id, transition in itertools.islice(outbox.iter_due(outbox_table), SWEEP_LIMIT)]
+
+    futures = [(sequence, send_executor.submit(deliver, issue_id, transition)) for issue_id, transition, sequence in keys]
+    outcomes, latencies, failures = [], [], []
+    for sequence, future in futures:
+        try:
+            outcome, latency_ms = future.result()
+        except Exception as e:
+            # Outbox bookkeeping failed (not the send itself): let the stream redeliver this record
+            logger.error(f"Outbox processing failed: {e}")
+            if sequence:
+                failures.append({'itemIdentifier': sequence})
+            continue
+        outcomes.append(outcome)
+        if latency_ms is not None:
+            latencies.append(latency_ms)
+
+    record_metrics(trigger, outcomes, latencies, (time.perf_counter() - started) * 1000)
+
+    # Requires "Report batch item failures" on the stream trigger
+    return {'batchItemFailures': failures}
@@ -0,0 +1,71 @@
+import json
+import os
+import logging
+import boto3
+from civicbot_utils.classification import classify_pending_batch, MICRO_BATCH_SIZE # Requires CivicBot Utilities Layer
+from civicbot_utils.similarity import get_similar_issues
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.http_pool import boto_config
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# --- CONFIGURATION (Reads from Environment Variables) ---
+REGION = os.environ.get('REGION', 'us-east-1')
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues')
+MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'amazon.titan-text-express-v1')
+HIGH_PRIORITY_TOPIC_ARN = os.environ.get('HIGH_PRIORITY_TOPIC_ARN') # Optional SNS alert topic
+# --- END CONFIGURATION ---
+
+# --- Initialize Clients (outside handler for reuse) ---
+dynamodb = boto3.resource('dynamodb', region_name=REGION, config=boto_config())
+issues_table = dynamodb.Table(TABLE_NAME)
+bedrock_rt = boto3.client('bedrock-runtime', region_name=REGION, config=boto_config())
+sns_client = boto3.client('sns', region_name=REGION, config=boto_config()) if HIGH_PRIORITY_TOPIC_ARN else None
+
+
+def alert_high_priority(message):
+    """Publishes a HIGH priority report to the alert topic (or just logs it if none is configured)."""
+    logger.info(f"HIGH priority report: {message['IssueID']}")
+    if sns_client:
+        sns_client.publish(
+            TopicArn=HIGH_PRIORITY_TOPIC_ARN,
+            Subject='CivicBot: HIGH priority report',
+            Message=f"Issue {message['IssueID']} was classified HIGH: {message['IssueType']}"
+        )
+
+
+@profiled
+def lambda_handler(event, context):
+    """
+    SQS-triggered worker for reports saved with Priority='PENDING'.
+    Configure the trigger with a batch size and batching window so each invocation gets a micro-batch.
+    """
+    records = event.get('Records', [])
+    logger.info(f"Received {len(records)} pending reports.")
+
+    failures = []
+    messages = []
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+            messages.append((record['messageId'], {'IssueID': body['IssueID'], 'IssueType': body['IssueType']}))
+        except (KeyError, ValueError) as e:
+            logger.error(f"Malformed classification message {record.get('messageId')}: {e}")
+            failures.append({'itemIdentifier': record.get('messageId')})
+
+    # One Bedrock call per micro-batch; a failed batch is returned to the queue for redelivery
+    for start in range(0, len(messages), MICRO_BATCH_SIZE):
+        chunk = messages[start:start + MICRO_BATCH_SIZE]
+        try:
+            classified = classify_pending_batch(
+                [message for _, message in chunk], issues_table, bedrock_rt, MODEL_ID, alert_high_priority,
+                find_similar=lambda issue_text: get_similar_issues(bedrock_rt, issue_text)
+            )
+            logger.info(f"Classified {len(classified)} reports: {classified}")
+        except Exception as e:
+            logger.error(f"Classification batch failed: {e}")
+            failures.extend({'itemIdentifier': message_id} for message_id, _ in chunk)
+
+    # Requires "Report batch item failures" on the SQS trigger
+    return {'batchItemFailures': failures}
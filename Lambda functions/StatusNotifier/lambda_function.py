@@ -2,22 +2,23 @@ import json
 import os
 import decimal
 import time
-from twilio.rest import Client
 from datetime import datetime
 import logging # <-- REQUIRED IMPORT
+import boto3
+from civicbot_utils import status_cache # Requires CivicBot Utilities Layer
+from civicbot_utils import outbox
+from civicbot_utils.http_pool import boto_config
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
 
 # Initialize the logger object globally
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# --- CONFIGURATION (Reads from Environment Variables) ---
-TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID').strip()
-TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN').strip()
-TWILIO_WHATSAPP_NUMBER = os.environ.get('TWILIO_WHATSAPP_NUMBER').strip() # Twilio Sandbox Number
-# --- END CONFIGURATION ---
-
-# Initialize Twilio Client
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# --- Initialize Clients (outside handler for reuse) ---
+# Notifications are not sent from here: they are written to the durable outbox and delivered
+# (with retries, backoff and dead-lettering) by the NotificationSender Lambda.
+dynamodb = boto3.resource('dynamodb', config=boto_config())
+outbox_table = dynamodb.Table(outbox.OUTBOX_TABLE)
 def build_notification_message(new_record, old_record):
     """Determines the type of change and builds a user-friendly message."""
     issue_id = new_record['IssueID']['S']
@@ -41,29 +42,33 @@ def build_notification_message(new_record, old_record):
     
     return None # No significant change to notify user about
 
-def send_whatsapp_notification(recipient_waid, message):
-    """Sends the actual outbound message via Twilio."""
-    try:
-        # Note: 'To' must include the whatsapp: prefix and the user's phone number
-        # We assume the user's phone number (WaId) is stored in the record.
-        # For POC, we assume the user's phone number is included in the event or retrieved from UserSessions
-        
-        # In a real app, the full number (including +country code) would be passed from the main table.
-        # Since we don't have that field, we'll use a placeholder variable for the recipient.
-        
-        twilio_client.messages.create(
-            from_=TWILIO_WHATSAPP_NUMBER,
-            body=message,
-            to='whatsapp:+XXXXXXXXXXXX' # logic to get the whatsapp number from dynamodb table
-        )
-        logger.info(f"Notification sent successfully. Twilio SID: {message_resource.sid}")
-    except Exception as e:
-        logger.error(f"Twilio send failed: {e}")
+def queue_whatsapp_notification(record, recipient_waid, message):
+    """Writes the notification to the outbox, keyed by issue and status transition."""
+    new_record = record['dynamodb']['NewImage']
+    changed_at = int(record['dynamodb'].get('ApproximateCreationDateTime', time.time()))
+    # StatusLastModified identifies the transition; stream redeliveries map to the same outbox row
+    transition = outbox.transition_key(
+        new_record['Status']['S'],
+        new_record.get('StatusLastModified', {}).get('N') or record['dynamodb']['SequenceNumber']
+    )
+    queued = outbox.enqueue(outbox_table, new_record['IssueID']['S'], transition, recipient_waid, message, changed_at)
+    if queued:
+        logger.info(f"Notification queued for {new_record['IssueID']['S']} ({transition}).")
+    else:
+        logger.info(f"Notification for {new_record['IssueID']['S']} ({transition}) already queued.")
 
+@profiled
 def lambda_handler(event, context):
     """Processes records from the DynamoDB Stream."""
     logger.info(f"Received {len(event['Records'])} records from stream.")
     
+    # Drop cached TrackStatus replies first: if this fails the batch is retried before any message is sent
+    changed_ids = [
+        record['dynamodb'].get('Keys', {}).get('IssueID', {}).get('S')
+        for record in event['Records'] if record['eventName'] in ('MODIFY', 'REMOVE')
+    ]
+    status_cache.invalidate(changed_ids)
+    
     for record in event['Records']:
         if record['eventName'] in ('INSERT', 'MODIFY'):
             
@@ -72,8 +77,7 @@ def lambda_handler(event, context):
             old_record = record['dynamodb'].get('OldImage', {})
             
             # The user's phone number (WaId) must be present in the record to send a message back.
-            # We assume it is stored in the record under a field like 'UserID' or 'WaId'.
-            # For this code, we'll assume it's stored under a field named 'WaId' (string type)
+            # handle_report_issue stores it under 'UserID'.
             recipient_waid = new_record.get('UserID', {}).get('S') # Get the user's phone number
             if not recipient_waid:
                 logger.warning("Record skipped: Missing WaId for notification.")
@@ -85,6 +89,7 @@ def lambda_handler(event, context):
             RECIPIENT_PHONE_NUMBER = f"whatsapp:{e164_number}"
             notification_message = build_notification_message(new_record, old_record)
             if notification_message:
-                send_whatsapp_notification(RECIPIENT_PHONE_NUMBER, notification_message)
+                # Outbox write errors propagate, so the stream retries the batch (the write is idempotent)
+                queue_whatsapp_notification(record, RECIPIENT_PHONE_NUMBER, notification_message)
     
     return {'statusCode': 200, 'body': 'Stream processing complete.'}
@@ -1,14 +1,22 @@
 import json
 import os
+import re
+import time
+import collections
 import urllib.parse
 import boto3
 import uuid
 import mimetypes
-import urllib.request
 # Import MessagingResponse for building the XML response
 from twilio.twiml.messaging_response import MessagingResponse 
 # Import Twilio client (optional for outbound, but good practice)
 from twilio.rest import Client 
+from civicbot_utils.messages import format_status_message, status_not_found_message, rating_feedback # Requires CivicBot Utilities Layer
+from civicbot_utils import status_cache
+from civicbot_utils.archive import load_issue
+from civicbot_utils.admission import AdmissionController
+from civicbot_utils.http_pool import boto_config, fetch
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
 
 # --- CONFIGURATION (Reads from Environment Variables) ---
 REGION = 'us-east-1' 
@@ -20,11 +28,174 @@ S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 DDB_TABLE_NAME = os.environ.get('DDB_TABLE_NAME')
 # --- END CONFIGURATION ---
-s3_client = boto3.client('s3')
-dynamo_resource = boto3.resource('dynamodb')
+s3_client = boto3.client('s3', config=boto_config())
+dynamo_resource = boto3.resource('dynamodb', config=boto_config())
 ddb_table = dynamo_resource.Table(DDB_TABLE_NAME)
 # Global client initialization
-lex_client = boto3.client('lexv2-runtime', region_name=REGION)
+lex_client = boto3.client('lexv2-runtime', region_name=REGION, config=boto_config())
+
+# --- LOCAL PRE-ROUTER (Lex bypass) ---
+# Tracking IDs are the first 8 hex chars of a uuid4 (see handle_report_issue)
+TRACKING_ID_PATTERN = re.compile(
+    r'^(?:(?:track|check|status|track status|status of|status for)\s*(?:id)?\s*[:#-]?\s*)?'
+    r'([0-9a-f]{8})\s*[?.!]*$',
+    re.IGNORECASE
+)
+# Explicit ratings ("rate 4", "rating: 5", "4 stars", "4/5")
+EXPLICIT_RATING_PATTERN = re.compile(
+    r'^(?:(?:rate(?:\s+service)?|rating)\s*[:=-]?\s*([1-5])|([1-5])\s*(?:stars?|/\s*5))\s*[.!]*$',
+    re.IGNORECASE
+)
+BARE_DIGIT_PATTERN = re.compile(r'^([1-5])\s*[.!]*$')
+METRICS_NAMESPACE = 'CivicBot/WhatsAppConnector'
+
+# Warm-container view of which slot Lex is waiting on per user: {user_id: (slot_name, expires_at)}
+# Lex V2 sessions idle out after 5 minutes by default.
+LEX_SESSION_TTL_SECONDS = 300
+_pending_slots = {}
+_route_counts = collections.Counter()
+
+# --- ADMISSION CONTROL ---
+# Per-WaId token buckets per flow (RATE_LIMITS) plus a global in-flight budget (GLOBAL_MAX_INFLIGHT).
+# The 'report' bucket is charged by CivicBotHandler.handle_report_issue, where the issue is created;
+# here text is 'status' or 'chat' and attachments are 'media'.
+# Status checks and ID recovery, anchored so "report a pothole near the status board" stays 'chat'
+STATUS_WORDING_PATTERN = re.compile(
+    r"^(?:(?:what(?:'s|\s+is)\s+(?:the\s+)?)?status\b|track\b|check\s+(?:the\s+|my\s+)?status\b"
+    r"|where\s+is\s+my\s+(?:report|issue|complaint)\b"
+    r"|(?:i\s+)?(?:forgot|lost)\s+(?:my\s+)?(?:issue\s+|tracking\s+|report\s+)?id\b|my\s+reports?\b)",
+    re.IGNORECASE
+)
+USER_THROTTLED_MESSAGE = (
+    "You're sending messages faster than we can handle them. "
+    "Please wait a few minutes and try again. Your earlier reports are safe."
+)
+SYSTEM_BUSY_MESSAGE = (
+    "We're receiving an unusually high number of messages right now. "
+    "Please try again in a few minutes."
+)
+admission = AdmissionController()
+
+
+def remember_dialog_state(user_id, lex_response):
+    """Records the slot Lex is eliciting (if any) so the pre-router does not hijack an open dialog."""
+    dialog_action = lex_response.get('sessionState', {}).get('dialogAction', {})
+    if dialog_action.get('type') in ('ElicitSlot', 'ConfirmIntent'):
+        _pending_slots[user_id] = (dialog_action.get('slotToElicit'), time.time() + LEX_SESSION_TTL_SECONDS)
+    else:
+        _pending_slots.pop(user_id, None)
+
+
+def get_pending_slot(user_id):
+    """Returns (has_open_dialog, slot_name) for the user as seen by this container."""
+    pending = _pending_slots.get(user_id)
+    if not pending:
+        return False, None
+    if pending[1] <= time.time():
+        _pending_slots.pop(user_id, None)
+        return False, None
+    return True, pending[0]
+
+
+def close_lex_dialog(user_id):
+    """Ends the Lex session after we answered its pending slot locally (no NLU charge)."""
+    _pending_slots.pop(user_id, None)
+    try:
+        lex_client.delete_session(
+            botId=LEX_BOT_ID,
+            botAliasId=LEX_ALIAS_ID,
+            localeId=LEX_LOCALE_ID,
+            sessionId=user_id
+        )
+    except Exception as e:
+        print(f"Error closing Lex session after fast-path reply: {e}")
+
+
+def fast_track_status(tracking_id):
+    """Same lookup as CivicBotHandler.handle_track_status, without the Lex/Lambda hops."""
+    def load_status(issue_id):
+        item = load_issue(issue_id, ddb_table)
+        return format_status_message(item) if item else None
+
+    return status_cache.get_status_message(tracking_id, load_status) or status_not_found_message(tracking_id)
+
+
+def route_locally(user_id, text_input):
+    """
+    Answers deterministic messages (tracking IDs, "status <id>", ratings) without Lex.
+    Returns (route, response_text), or (None, None) when the message should go to Lex.
+    """
+    has_open_dialog, pending_slot = get_pending_slot(user_id)
+
+    id_match = TRACKING_ID_PATTERN.match(text_input)
+    if id_match and (not has_open_dialog or pending_slot == 'TrackingID'):
+        try:
+            response_text = fast_track_status(id_match.group(1).lower())
+        except Exception as e:
+            print(f"Fast-path status lookup failed, falling back to Lex: {e}")
+            return None, None
+        if has_open_dialog:
+            close_lex_dialog(user_id)
+        return 'fast_track', response_text
+
+    rating_match = EXPLICIT_RATING_PATTERN.match(text_input)
+    if rating_match and (not has_open_dialog or pending_slot == 'RatingScore'):
+        _state, response_text = rating_feedback(rating_match.group(1) or rating_match.group(2))
+        if has_open_dialog:
+            close_lex_dialog(user_id)
+        return 'fast_rating', response_text
+
+    # A bare digit is only a rating when Lex is known to be asking for one;
+    # otherwise it may be a menu choice or another slot answer.
+    digit_match = BARE_DIGIT_PATTERN.match(text_input)
+    if digit_match and pending_slot == 'RatingScore':
+        _state, response_text = rating_feedback(digit_match.group(1))
+        close_lex_dialog(user_id)
+        return 'fast_rating', response_text
+
+    return None, None
+
+
+def classify_flow(user_id, text_input, num_media):
+    """Maps an inbound message to the admission flow it is charged against: media, status or chat."""
+    if num_media > 0:
+        return 'media'
+    if TRACKING_ID_PATTERN.match(text_input) or EXPLICIT_RATING_PATTERN.match(text_input):
+        return 'status'
+    if not get_pending_slot(user_id)[0] and STATUS_WORDING_PATTERN.match(text_input):
+        return 'status'
+    return 'chat'
+
+
+def twiml_reply(response_text, status_code=200):
+    twiml = MessagingResponse()
+    twiml.message(response_text)
+    return {
+        'statusCode': status_code,
+        'headers': {'Content-Type': 'text/xml'},
+        'body': str(twiml)
+    }
+
+
+def record_route(route):
+    """Emits a CloudWatch Embedded Metric Format line per routed message (hit rate = fast_* / total)."""
+    _route_counts[route] += 1
+    total = sum(_route_counts.values())
+    fast_hits = sum(count for name, count in _route_counts.items() if name.startswith('fast_'))
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Route']],
+                'Metrics': [{'Name': 'RoutedMessages', 'Unit': 'Count'}]
+            }]
+        },
+        'Route': route,
+        'RoutedMessages': 1,
+        'ContainerFastPathHitRate': round(fast_hits / total, 4)
+    }))
+
 
 def invoke_lex(user_id, text_input, session_attributes={}):
     """Sends the user's message to the Lex Bot and retrieves the response."""
@@ -37,6 +208,7 @@ def invoke_lex(user_id, text_input, session_attributes={}):
             text=text_input,
             sessionState={'sessionAttributes': session_attributes}
         )
+        remember_dialog_state(user_id, response)
         # Extract the final message content
         messages = response.get('messages', [])
         if messages:
@@ -51,8 +223,8 @@ def handle_media_upload(user_id, media_url, content_type):
     try:
         # 1. Download media from Twilio's URL
         print(f"Downloading media from: {media_url}")
-        with urllib.request.urlopen(media_url) as response:
-            media_data = response.read()
+        # Pooled keep-alive session: no new TCP/TLS handshake per attachment on a warm container
+        media_data = fetch(media_url)
             
         # 2. Generate a unique S3 key (filename)
         # Guess the file extension (e.g., .jpg) from the content type (e.g., image/jpeg)
@@ -94,6 +266,30 @@ def handle_media_upload(user_id, media_url, content_type):
         print(f"Error handling media upload: {e}")
         return "Sorry, I had a problem saving your media file."
 
+def handle_message(user_id, text_input, num_media, data):
+    """Processes one admitted message and returns the reply text."""
+    if num_media > 0:
+        # --- MEDIA PROCESSING ---
+        media_url = data.get('MediaUrl0', [''])[0]
+        content_type = data.get('MediaContentType0', ['application/octet-stream'])[0]
+
+        if media_url:
+            return handle_media_upload(user_id, media_url, content_type)
+        return "I see you tried to send media, but I couldn't find it."
+
+    # --- TEXT PROCESSING (Original Flow) ---
+    if not text_input:
+        return "Please send a message."
+
+    # Deterministic messages skip Lex and the CivicBotHandler hop
+    route, response_text = route_locally(user_id, text_input)
+    if not route:
+        route = 'lex'
+        response_text = invoke_lex(user_id, text_input)
+    record_route(route)
+    return response_text
+
+@profiled
 def lambda_handler(event, context):
     """Handles incoming POST requests from Twilio."""
     try:
@@ -108,40 +304,24 @@ def lambda_handler(event, context):
         user_id = data.get('WaId', ['N/A'])[0] 
         # The 'Body' contains the text message
         num_media = int(data.get('NumMedia', ['0'])[0])
-        if num_media > 0:
-            # --- MEDIA PROCESSING ---
-            media_url = data.get('MediaUrl0', [''])[0]
-            content_type = data.get('MediaContentType0', ['application/octet-stream'])[0]
-            
-            if media_url:
-                response_text = handle_media_upload(user_id, media_url, content_type)
-            else:
-                response_text = "I see you tried to send media, but I couldn't find it."
-        else:
-            # --- TEXT PROCESSING (Original Flow) ---
-            text_input = data.get('Body', [''])[0].strip()
-            if not text_input:
-                response_text = "Please send a message."
-            else:
-                response_text = invoke_lex(user_id, text_input)
+        text_input = data.get('Body', [''])[0].strip()
+
+        # --- ADMISSION CONTROL (shed before any S3/Lex/DynamoDB work) ---
+        # Shed messages still get a 200 so Twilio does not retry them.
+        if not admission.admit_user(user_id, classify_flow(user_id, text_input, num_media)):
+            record_route('shed_user')
+            return twiml_reply(USER_THROTTLED_MESSAGE)
+
+        with admission.global_slot() as admitted:
+            if not admitted:
+                record_route('shed_global')
+                return twiml_reply(SYSTEM_BUSY_MESSAGE)
+            response_text = handle_message(user_id, text_input, num_media, data)
 
         # --- OUTBOUND RESPONSE (TwiML) ---
-        twiml = MessagingResponse()
-        twiml.message(response_text)
-        
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'text/xml'},
-            'body': str(twiml)
-        }
+        return twiml_reply(response_text)
 
     except Exception as e:
         print(f"Full Lambda error: {e}")
         # Send a generic failure message back to the user via TwiML
-        twiml = MessagingResponse()
-        twiml.message("I'm sorry, an internal server error occurred.")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'text/xml'},
-            'body': str(twiml)
-        }
+        return twiml_reply("I'm sorry, an internal server error occurred.", 500)
@@ -0,0 +1,175 @@
+import json
+import os
+import re
+import time
+import boto3
+import numpy as np # Requires a NumPy layer (e.g. AWSSDKPandas-Python311)
+from boto3.dynamodb.conditions import Attr
+from civicbot_utils.bulk_read import parallel_scan # Requires CivicBot Utilities Layer
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.http_pool import boto_config
+
+# --- Initialize Clients (outside handler for reuse) ---
+dynamodb = boto3.resource('dynamodb', config=boto_config())
+table_name = os.environ.get('DYNAMODB_TABLE_NAME')
+issues_table = dynamodb.Table(table_name)
+
+# --- CONFIGURATION ---
+CACHE_TTL_SECONDS = int(os.environ.get('HOTSPOT_CACHE_TTL', '300'))
+DEFAULT_DAYS = 7
+DEFAULT_CELL_KM = 0.5
+DEFAULT_LIMIT = 10
+KM_PER_DEGREE = 111.32
+PRIORITIES = ['HIGH', 'MEDIUM', 'LOW', 'Unknown']
+
+# handle_report_issue stores shared pins as "GPS Coordinates: LAT:X|LONG:Y"
+GPS_PATTERN = re.compile(r'LAT:\s*(-?\d+(?:\.\d+)?)\s*\|\s*LONG:\s*(-?\d+(?:\.\d+)?)', re.IGNORECASE)
+
+# Warm-container cache: {cache_key: (expires_at, payload)}
+_hotspot_cache = {}
+
+# --- CORS Headers ---
+headers = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "GET,OPTIONS"
+}
+
+
+def load_issue_arrays(since_ts, type_filter=None):
+    """Scans issues reported since `since_ts` and returns (lat, lon, timestamp, type, priority) arrays."""
+    lats, lons, stamps, types, priorities = [], [], [], [], []
+    items = parallel_scan(
+        issues_table,
+        ProjectionExpression='UserLocation, #ts, IssueType, Priority',
+        ExpressionAttributeNames={'#ts': 'Timestamp'},
+        FilterExpression=Attr('Timestamp').gte(since_ts)
+    )
+    for item in items:
+        issue_type = item.get('IssueType', '')
+        if type_filter and type_filter not in issue_type.lower():
+            continue
+        match = GPS_PATTERN.search(item.get('UserLocation', ''))
+        if not match:
+            continue # Text-only addresses cannot be binned
+        lats.append(float(match.group(1)))
+        lons.append(float(match.group(2)))
+        stamps.append(int(item.get('Timestamp', 0)))
+        types.append(issue_type.strip().lower())
+        priorities.append(item.get('Priority', 'Unknown'))
+
+    priority_codes = np.array(
+        [PRIORITIES.index(p) if p in PRIORITIES else PRIORITIES.index('Unknown') for p in priorities],
+        dtype=np.int64
+    )
+    return (np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64),
+            np.array(stamps, dtype=np.int64), np.array(types, dtype=object), priority_codes)
+
+
+def find_hotspots(lats, lons, types, priority_codes, cell_km=DEFAULT_CELL_KM, limit=DEFAULT_LIMIT):
+    """Grid-bins points into ~cell_km squares and returns the densest cells, ranked by count."""
+    if lats.size == 0:
+        return []
+
+    # --- 1. Grid binning (longitude cells are widened by the latitude's cosine) ---
+    lat_step = cell_km / KM_PER_DEGREE
+    lon_step = lat_step / max(np.cos(np.radians(lats.mean())), 0.01)
+    cells = np.stack([np.floor(lats / lat_step), np.floor(lons / lon_step)], axis=1).astype(np.int64)
+    unique_cells, cell_index, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cell_index = cell_index.reshape(-1)
+
+    # --- 2. Rank cells and keep the top `limit` ---
+    top = np.argsort(-counts, kind='stable')[:limit]
+    rank = np.full(len(unique_cells), -1, dtype=np.int64)
+    rank[top] = np.arange(len(top))
+    point_rank = rank[cell_index]
+    selected = point_rank >= 0
+
+    # --- 3. Dominant priority / type per top cell via 2-D bincount ---
+    n_top, n_prio = len(top), len(PRIORITIES)
+    prio_matrix = np.bincount(
+        point_rank[selected] * n_prio + priority_codes[selected], minlength=n_top * n_prio
+    ).reshape(n_top, n_prio)
+    type_names, type_codes = np.unique(types[selected], return_inverse=True)
+    type_matrix = np.bincount(
+        point_rank[selected] * len(type_names) + type_codes.reshape(-1), minlength=n_top * len(type_names)
+    ).reshape(n_top, len(type_names))
+
+    # Cell centre = mean of its points, so the pin lands on the actual cluster
+    lat_sum = np.bincount(point_rank[selected], weights=lats[selected], minlength=n_top)
+    lon_sum = np.bincount(point_rank[selected], weights=lons[selected], minlength=n_top)
+    top_counts = counts[top]
+
+    return [
+        {
+            "rank": i + 1,
+            "lat": round(float(lat_sum[i] / top_counts[i]), 5),
+            "long": round(float(lon_sum[i] / top_counts[i]), 5),
+            "count": int(top_counts[i]),
+            "dominantPriority": PRIORITIES[int(prio_matrix[i].argmax())],
+            "highPriorityCount": int(prio_matrix[i, PRIORITIES.index('HIGH')]),
+            "dominantIssueType": str(type_names[int(type_matrix[i].argmax())])
+        }
+        for i in range(n_top)
+    ]
+
+
+def get_hotspots(days, type_filter, cell_km, limit, now=None):
+    """Cached hotspot computation; the cache key pins the window start to CACHE_TTL_SECONDS buckets."""
+    now = int(now or time.time())
+    window_bucket = now // CACHE_TTL_SECONDS
+    cache_key = (window_bucket, days, type_filter, cell_km, limit)
+
+    cached = _hotspot_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1], True
+
+    since_ts = window_bucket * CACHE_TTL_SECONDS - days * 86400
+    lats, lons, _stamps, types, priority_codes = load_issue_arrays(since_ts, type_filter)
+    payload = {
+        "windowStart": since_ts,
+        "windowDays": days,
+        "issueType": type_filter,
+        "cellKm": cell_km,
+        "pointsAnalyzed": int(lats.size),
+        "hotspots": find_hotspots(lats, lons, types, priority_codes, cell_km, limit)
+    }
+
+    # Drop expired windows so the warm container does not grow without bound
+    for key in [k for k, v in _hotspot_cache.items() if v[0] <= now]:
+        del _hotspot_cache[key]
+    _hotspot_cache[cache_key] = ((window_bucket + 1) * CACHE_TTL_SECONDS, payload)
+    return payload, False
+
+
+@profiled
+def lambda_handler(event, context):
+    try:
+        # Optional query parameters: ?days=7&type=sewage&cellKm=0.5&limit=10
+        params = event.get('queryStringParameters') or {}
+        days = max(1, min(int(params.get('days', DEFAULT_DAYS)), 365))
+        type_filter = (params.get('type') or '').strip().lower() or None
+        cell_km = max(0.05, min(float(params.get('cellKm', DEFAULT_CELL_KM)), 50.0))
+        limit = max(1, min(int(params.get('limit', DEFAULT_LIMIT)), 100))
+
+        payload, cache_hit = get_hotspots(days, type_filter, cell_km, limit)
+
+        return {
+            'statusCode': 200,
+            'headers': {**headers, 'X-Cache': 'HIT' if cache_hit else 'MISS'},
+            'body': json.dumps(payload)
+        }
+
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({"error": f"Invalid query parameter: {e}"})
+        }
+    except Exception as e:
+        print(f"Error: {e}")
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({"error": str(e)})
+        }
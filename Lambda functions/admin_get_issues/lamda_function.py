@@ -1,52 +1,136 @@
 import json
 import os
+import base64
+import heapq
 import boto3
-import decimal
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key
-
-# --- Helper Class to serialize DynamoDB Decimal types ---
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return str(o)
-        return super(DecimalEncoder, self).default(o)
+from civicbot_utils.status_shards import STATUS_SHARD_COUNT, STATUS_SHARD_INDEX, all_status_shard_keys # Requires CivicBot Utilities Layer
+from civicbot_utils.archive import load_issue
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.serialization import dumps
+from civicbot_utils.http_pool import boto_config
 
 # --- Initialize Clients (outside handler for reuse) ---
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=boto_config())
 table_name = os.environ.get('DYNAMODB_TABLE_NAME')
-index_name = os.environ.get('GSI_NAME')
 issues_table = dynamodb.Table(table_name)
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+shard_executor = ThreadPoolExecutor(max_workers=STATUS_SHARD_COUNT) # Reused across warm invocations
 
 # --- CORS Headers ---
 headers = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Headers": "Content-Type,Authorization",
-    "Access-Control-Allow-Methods": "GET,OPTIONS"
+    "Access-Control-Allow-Methods": "GET,OPTIONS",
+    "Access-Control-Expose-Headers": "X-Next-Cursor"
 }
 
+def encode_cursor(state):
+    """Opaque page cursor for the X-Next-Cursor header (None when there are no more pages)."""
+    if state is None:
+        return None
+    return base64.urlsafe_b64encode(dumps(state).encode()).decode()
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+def index_key(item):
+    """ExclusiveStartKey for the sharded GSI (table key + index keys)."""
+    return {'IssueID': item['IssueID'], 'StatusShard': item['StatusShard'], 'Timestamp': int(item['Timestamp'])}
+
+def query_shard(shard_key, start_key, limit):
+    kwargs = {
+        'IndexName': STATUS_SHARD_INDEX,
+        'KeyConditionExpression': Key('StatusShard').eq(shard_key),
+        'ScanIndexForward': False, # Newest first within the shard
+        'Limit': limit
+    }
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+    response = issues_table.query(**kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def query_status_page(status, limit, cursor_state):
+    """
+    Scatter-gather over every Status#shardN partition: fetch up to `limit` newest items per shard
+    in parallel, merge by Timestamp (newest first), and keep the first `limit`.
+    The cursor stores, per shard, the key of the last item actually returned (or None once exhausted).
+    """
+    shard_keys = all_status_shard_keys(status)
+    if cursor_state is None:
+        cursor_state = {shard: {'start': None} for shard in shard_keys}
+    active = [shard for shard in shard_keys if shard in cursor_state]
+
+    results = dict(zip(active, shard_executor.map(
+        lambda shard: query_shard(shard, cursor_state[shard]['start'], limit), active
+    )))
+
+    merged = heapq.merge(
+        *[[(shard, item) for item in items] for shard, (items, _) in results.items()],
+        key=lambda pair: pair[1].get('Timestamp', 0),
+        reverse=True
+    )
+    page = [pair for _, pair in zip(range(limit), merged)]
+
+    taken = {shard: 0 for shard in active}
+    for shard, _ in page:
+        taken[shard] += 1
+
+    next_state = {}
+    for shard in active:
+        items, last_key = results[shard]
+        if taken[shard] < len(items):
+            # Resume right after the last item this shard contributed to the page
+            start = index_key(items[taken[shard] - 1]) if taken[shard] else cursor_state[shard]['start']
+            next_state[shard] = {'start': start}
+        elif last_key:
+            next_state[shard] = {'start': last_key}
+        # else: shard exhausted, dropped from the cursor
+
+    return [item for _, item in page], (next_state or None)
+
+@profiled
 def lambda_handler(event, context):
     try:
-        # Check for optional query parameter ?status=New
-        params = event.get('queryStringParameters')
-        status_filter = None
-        if params and 'status' in params:
-            status_filter = params['status']
+        # Optional query parameters: ?status=New&limit=100&cursor=<X-Next-Cursor from the previous page>
+        # or ?issueId=1234abcd for a single issue (also resolves archived issues)
+        params = event.get('queryStringParameters') or {}
+        if params.get('issueId'):
+            item = load_issue(params['issueId'], issues_table)
+            return {
+                'statusCode': 200 if item else 404,
+                'headers': headers,
+                'body': dumps([item] if item else [])
+            }
+
+        status_filter = params.get('status')
+        limit = max(1, min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        cursor_state = decode_cursor(params.get('cursor'))
             
         if status_filter:
-            # Use the GSI to find all issues with a specific status
-            response = issues_table.query(
-                IndexName=index_name,
-                KeyConditionExpression=Key('Status').eq(status_filter),
-                ScanIndexForward=False # Sort by timestamp, newest first
-            )
+            # Query every shard of the sharded status GSI in parallel, newest first
+            items, next_state = query_status_page(status_filter, limit, cursor_state)
         else:
             # If no filter, scan the whole table (less efficient, ok for small data)
-            response = issues_table.scan(Limit=500)
+            scan_kwargs = {'Limit': limit}
+            if cursor_state:
+                scan_kwargs['ExclusiveStartKey'] = cursor_state
+            response = issues_table.scan(**scan_kwargs)
+            items, next_state = response.get('Items', []), response.get('LastEvaluatedKey')
+
+        response_headers = dict(headers)
+        next_cursor = encode_cursor(next_state)
+        if next_cursor:
+            response_headers['X-Next-Cursor'] = next_cursor
 
         return {
             'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps(response.get('Items', []), cls=DecimalEncoder)
+            'headers': response_headers,
+            'body': dumps(items)
         }
 
     except Exception as e:
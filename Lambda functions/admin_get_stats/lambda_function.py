@@ -1,19 +1,16 @@
 import json
 import os
 import boto3
-import decimal
 import collections
-
-# --- Helper Class to serialize DynamoDB Decimal types ---
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return str(o)
-        return super(DecimalEncoder, self).default(o)
+from civicbot_utils.bulk_read import parallel_scan # Requires CivicBot Utilities Layer
+from civicbot_utils.archive import get_archived_counters
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.serialization import dumps
+from civicbot_utils.http_pool import boto_config
 
 # --- Initialize Clients (outside handler for reuse) ---
-dynamodb = boto3.resource('dynamodb')
-bedrock_rt = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION'))
+dynamodb = boto3.resource('dynamodb', config=boto_config())
+bedrock_rt = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION'), config=boto_config())
 table_name = os.environ.get('DYNAMODB_TABLE_NAME')
 model_id = os.environ.get('BEDROCK_MODEL_ID')
 issues_table = dynamodb.Table(table_name)
@@ -52,19 +49,22 @@ def get_ai_insight(items_json):
         return "AI insight is currently unavailable."
 
 
+@profiled
 def lambda_handler(event, context):
     try:
         # --- 1. Get All Data ---
-        # Scan is acceptable here as analytics needs all data
-        response = issues_table.scan()
-        items = response.get('Items', [])
+        # Analytics needs all data: parallel segmented scan with full pagination
+        # Only a small sample is kept in memory for the Bedrock prompt
+        sample_items = []
 
         # --- 2. Python-based Aggregation (for Charts) ---
         status_counts = collections.defaultdict(int)
         priority_counts = collections.defaultdict(int)
         total_pending = 0
 
-        for item in items:
+        for item in parallel_scan(issues_table):
+            if len(sample_items) < 20:
+                sample_items.append(item)
             status = item.get('Status', 'Unknown')
             priority = item.get('Priority', 'Unknown')
             
@@ -74,9 +74,21 @@ def lambda_handler(event, context):
             if status.lower() in ['new', 'processing']:
                 total_pending += 1
 
+        # Archived issues are no longer in the hot table; add their running totals back in.
+        # Like archive.load_issue, an unavailable archive index degrades to hot-table-only counts.
+        try:
+            archived_by_status, archived_by_priority = get_archived_counters()
+        except Exception as e:
+            print(f"Archived counters unavailable, showing hot-table counts only: {e}")
+            archived_by_status, archived_by_priority = {}, {}
+        for status, count in archived_by_status.items():
+            status_counts[status] += count
+        for priority, count in archived_by_priority.items():
+            priority_counts[priority] += count
+
         # --- 3. Bedrock AI Insight ---
         # Get AI insight based on the first 20 items (to avoid huge Bedrock payload)
-        ai_summary = get_ai_insight(json.dumps(items[:20], cls=DecimalEncoder))
+        ai_summary = get_ai_insight(dumps(sample_items))
 
         # --- 4. Format the Dashboard Payload ---
         dashboard_data = {
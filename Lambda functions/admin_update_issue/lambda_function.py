@@ -2,18 +2,14 @@
 import json
 import os
 import boto3
-import decimal
 from datetime import datetime
-
-# --- Helper Class to serialize DynamoDB Decimal types ---
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return str(o)
-        return super(DecimalEncoder, self).default(o)
+from civicbot_utils.status_shards import status_shard_key # Requires CivicBot Utilities Layer
+from civicbot_utils.profiling import profiled # Opt-in via PROFILE_SAMPLE_RATE
+from civicbot_utils.serialization import dumps
+from civicbot_utils.http_pool import boto_config
 
 # --- Initialize Clients (outside handler for reuse) ---
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=boto_config())
 table_name = os.environ.get('DYNAMODB_TABLE_NAME')
 issues_table = dynamodb.Table(table_name)
 
@@ -24,6 +20,7 @@ headers = {
     "Access-Control-Allow-Methods": "PUT,OPTIONS" # Allow PUT for updates
 }
 
+@profiled
 def lambda_handler(event, context):
     try:
         # Get the IssueID from the URL path (e.g., /issues/1234abcd)
@@ -43,17 +40,19 @@ def lambda_handler(event, context):
     
     # CRITICAL: Removed the problematic #ts update.
     # We use #lmt (StatusLastModified) for tracking changes.
-    UpdateExpression="SET #s = :s, #ecd = :ecd, #lmt = :lmt",
+    UpdateExpression="SET #s = :s, #shard = :shard, #ecd = :ecd, #lmt = :lmt",
     
     ExpressionAttributeNames={
         '#s': 'Status',
         '#ecd': 'ExpectedCompletionDate',
-        '#lmt': 'StatusLastModified' 
+        '#lmt': 'StatusLastModified',
+        '#shard': 'StatusShard' # Keeps the sharded status GSI in step with Status
         # Removed '#ts': 'Timestamp'
     },
     ExpressionAttributeValues={
         ':s': new_status,
         ':ecd': new_date,
+        ':shard': status_shard_key(new_status, issue_id),
         ':lmt': current_time_int  # StatusLastModified is updated here
         # Removed ':ts_val': current_time_int
     },
@@ -63,7 +62,7 @@ def lambda_handler(event, context):
         return {
             'statusCode': 200,
             'headers': headers,
-            'body': json.dumps(response.get('Attributes', {}), cls=DecimalEncoder)
+            'body': dumps(response.get('Attributes', {}))
         }
 
     except Exception as e:
@@ -0,0 +1 @@
+"""Shared helpers for the CivicBot Lambda functions (CivicBot Utilities Layer)."""
@@ -0,0 +1,237 @@
+"""
+Admission control for inbound WhatsApp messages.
+
+  * Per-user token buckets keyed on WaId, with separate limits per flow (report creation is stricter
+    than status checks). Configure with RATE_LIMITS="report=5:3600,media=10:3600,chat=20:60,status=30:60",
+    i.e. <flow>=<burst capacity>:<seconds to refill the full bucket>. WhatsApp_Connector charges
+    media/status/chat per inbound message; CivicBotHandler charges 'report' when an issue is created.
+  * A global in-flight budget (GLOBAL_MAX_INFLIGHT). It is counted in ADMISSION_SLOT_SECONDS time
+    slots, so counts leaked by timed-out invocations expire on their own.
+
+Counters live in a shared store: Redis when ADMISSION_REDIS_URL is set, otherwise the DynamoDB
+table ADMISSION_TABLE (partition key "Key", TTL attribute "ExpiresAt"), otherwise per-container
+memory only. Each warm container also remembers users it has just denied, so repeat spam is
+rejected without touching the shared store. If the store is unreachable, messages are admitted
+(fail open): rate limiting must never lock citizens out.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+logger = logging.getLogger()
+
+DEFAULT_RATE_LIMITS = 'report=5:3600,media=10:3600,chat=20:60,status=30:60'
+GLOBAL_MAX_INFLIGHT = int(os.environ.get('GLOBAL_MAX_INFLIGHT', '0')) # 0 = no global budget
+SLOT_SECONDS = int(os.environ.get('ADMISSION_SLOT_SECONDS', '60'))
+REDIS_URL = os.environ.get('ADMISSION_REDIS_URL')
+ADMISSION_TABLE = os.environ.get('ADMISSION_TABLE')
+KEY_PREFIX = 'civicbot:admission:'
+
+
+class StoreContention(Exception):
+    """The shared bucket kept changing under us; the outcome is unknown, so the message is admitted."""
+
+
+def parse_rate_limits(spec):
+    """'report=5:3600,status=30:60' -> {'report': (5.0, 5/3600), 'status': (30.0, 0.5)} (capacity, tokens/s)."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        flow, _, value = part.partition('=')
+        capacity, _, period = value.partition(':')
+        limits[flow.strip()] = (float(capacity), float(capacity) / float(period))
+    return limits
+
+
+def refill(tokens, updated_at, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+class LocalStore:
+    """Per-container counters; used when no shared store is configured."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def take_token(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated_at, capacity, rate, now)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed, tokens
+
+    def incr(self, key, delta, ttl):
+        with self.lock:
+            value, expires_at = self.counters.get(key, (0, 0))
+            if expires_at <= time.time():
+                value = 0
+            value += delta
+            self.counters[key] = (value, time.time() + ttl)
+            return value
+
+    def get(self, key):
+        value, expires_at = self.counters.get(key, (0, 0))
+        return value if expires_at > time.time() else 0
+
+
+class RedisStore:
+    """Atomic token bucket via a Lua script; slot counters via INCRBY + EXPIRE."""
+
+    TOKEN_BUCKET_LUA = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+    local allowed = 0
+    if tokens >= 1 then tokens = tokens - 1; allowed = 1 end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis # Optional: pip install redis -t python/ in the utility layer
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        self.token_bucket = self.client.register_script(self.TOKEN_BUCKET_LUA)
+
+    def take_token(self, key, capacity, rate, now):
+        allowed, tokens = self.token_bucket(keys=[KEY_PREFIX + key], args=[capacity, rate, now])
+        return bool(allowed), float(tokens)
+
+    def incr(self, key, delta, ttl):
+        pipe = self.client.pipeline()
+        pipe.incrby(KEY_PREFIX + key, delta)
+        pipe.expire(KEY_PREFIX + key, ttl)
+        return int(pipe.execute()[0])
+
+    def get(self, key):
+        return int(self.client.get(KEY_PREFIX + key) or 0)
+
+
+class DynamoStore:
+    """Token bucket with optimistic concurrency (conditional put on UpdatedAt); counters via ADD."""
+
+    def __init__(self, table_name):
+        import boto3
+        from civicbot_utils.http_pool import boto_config
+        self.table = boto3.resource('dynamodb', config=boto_config()).Table(table_name)
+
+    def take_token(self, key, capacity, rate, now, attempts=3):
+        for _ in range(attempts):
+            item = self.table.get_item(Key={'Key': key}, ConsistentRead=True).get('Item')
+            tokens = float(item['Tokens']) if item else capacity
+            updated_at = float(item['UpdatedAt']) if item else now
+            tokens = refill(tokens, updated_at, capacity, rate, now)
+            allowed = tokens >= 1
+            new_item = {
+                'Key': key,
+                'Tokens': Decimal(str(round(tokens - 1 if allowed else tokens, 6))),
+                'UpdatedAt': Decimal(str(now)),
+                'ExpiresAt': int(now + capacity / rate + 60)
+            }
+            try:
+                if item:
+                    self.table.put_item(Item=new_item, ConditionExpression="UpdatedAt = :prev",
+                                        ExpressionAttributeValues={':prev': item['UpdatedAt']})
+                else:
+                    self.table.put_item(Item=new_item, ConditionExpression="attribute_not_exists(#k)",
+                                        ExpressionAttributeNames={'#k': 'Key'})
+                return allowed, tokens
+            except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+                continue # Another container updated the bucket; re-read and retry
+        # Near-simultaneous webhooks (e.g. several photos sent at once) can all race on one bucket
+        raise StoreContention(f"{key}: {attempts} conditional writes lost")
+
+    def incr(self, key, delta, ttl):
+        response = self.table.update_item(
+            Key={'Key': key},
+            UpdateExpression="ADD InFlight :d SET ExpiresAt = :exp",
+            ExpressionAttributeValues={':d': delta, ':exp': int(time.time() + ttl)},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['InFlight'])
+
+    def get(self, key):
+        item = self.table.get_item(Key={'Key': key}).get('Item')
+        return int(item['InFlight']) if item else 0
+
+
+def build_store():
+    if REDIS_URL:
+        try:
+            return RedisStore(REDIS_URL)
+        except ImportError:
+            logger.warning("ADMISSION_REDIS_URL is set but the redis package is not installed.")
+    if ADMISSION_TABLE:
+        return DynamoStore(ADMISSION_TABLE)
+    return LocalStore()
+
+
+class AdmissionController:
+
+    def __init__(self, store=None, limits=None, global_max_inflight=GLOBAL_MAX_INFLIGHT, slot_seconds=SLOT_SECONDS):
+        self.store = store or build_store()
+        self.limits = limits or parse_rate_limits(os.environ.get('RATE_LIMITS', DEFAULT_RATE_LIMITS))
+        self.global_max_inflight = global_max_inflight
+        self.slot_seconds = slot_seconds
+        self._denied_until = {} # Warm-container fast path: (wa_id, flow) -> time the next token is due
+
+    def admit_user(self, wa_id, flow, now=None):
+        """Takes one token from the user's bucket for `flow`. Unknown flows are not limited."""
+        if flow not in self.limits:
+            return True
+        now = now or time.time()
+        local_key = (wa_id, flow)
+        if self._denied_until.get(local_key, 0) > now:
+            return False
+
+        capacity, rate = self.limits[flow]
+        try:
+            allowed, tokens = self.store.take_token(f"user#{wa_id}#{flow}", capacity, rate, now)
+        except StoreContention as e:
+            logger.warning(f"Admission bucket contended, admitting message: {e}")
+            return True
+        except Exception as e:
+            logger.error(f"Admission store unavailable, admitting message: {e}")
+            return True
+
+        if allowed:
+            self._denied_until.pop(local_key, None)
+        else:
+            # Only a real empty-bucket result gets here, so `tokens` is the bucket's actual level
+            self._denied_until[local_key] = now + (1 - tokens) / rate
+            if len(self._denied_until) > 10000:
+                self._denied_until = {k: v for k, v in self._denied_until.items() if v > now}
+        return allowed
+
+    @contextmanager
+    def global_slot(self):
+        """Yields True if the message fits in the global in-flight budget (current + previous slot)."""
+        if self.global_max_inflight <= 0:
+            yield True
+            return
+
+        slot = int(time.time() // self.slot_seconds)
+        key = f"global#inflight#{slot}"
+        acquired = False
+        try:
+            current = self.store.incr(key, 1, self.slot_seconds * 2)
+            acquired = True
+            admitted = current + self.store.get(f"global#inflight#{slot - 1}") <= self.global_max_inflight
+        except Exception as e:
+            logger.error(f"Admission store unavailable, admitting message: {e}")
+            admitted = True
+        try:
+            yield admitted
+        finally:
+            if acquired:
+                try:
+                    self.store.incr(key, -1, self.slot_seconds * 2)
+                except Exception as e:
+                    logger.error(f"Releasing global admission slot failed: {e}")
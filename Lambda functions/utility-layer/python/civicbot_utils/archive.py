@@ -0,0 +1,87 @@
+"""
+Cold tier for completed issues.
+
+Completed issues older than N days are moved by archive_completed into gzip JSON Lines files in the
+media bucket, partitioned by completion date:
+    s3://<ARCHIVE_BUCKET>/<ARCHIVE_PREFIX>/dt=YYYY-MM-DD/part-<run>.jsonl.gz
+The ARCHIVE_INDEX_TABLE (partition key IssueID) maps every archived ID to its file. Its
+COUNTERS_KEY item holds running totals of archived issues, so dashboard aggregates stay correct
+after the hot rows are deleted.
+"""
+import decimal
+import gzip
+import json
+import logging
+import os
+
+import boto3
+
+from civicbot_utils.http_pool import boto_config
+
+logger = logging.getLogger()
+
+ARCHIVE_BUCKET = os.environ.get('ARCHIVE_BUCKET', os.environ.get('S3_BUCKET_NAME', 'civicbot-media-reports'))
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archive/issues')
+ARCHIVE_INDEX_TABLE = os.environ.get('ARCHIVE_INDEX_TABLE', 'CivicIssuesArchiveIndex')
+COUNTERS_KEY = '#counters'
+ARCHIVED_STATUS = 'Completed'
+
+_index_table = None
+_s3_client = None
+
+
+def get_index_table():
+    global _index_table
+    if _index_table is None:
+        _index_table = boto3.resource('dynamodb', config=boto_config()).Table(ARCHIVE_INDEX_TABLE)
+    return _index_table
+
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3', config=boto_config())
+    return _s3_client
+
+
+def load_archived_issue(issue_id, index_table=None, s3_client=None):
+    """Resolves an archived ID through the index and reads it back from its archive file (or None)."""
+    index_table = index_table or get_index_table()
+    entry = index_table.get_item(Key={'IssueID': issue_id}).get('Item')
+    if not entry:
+        return None
+
+    s3_client = s3_client or get_s3_client()
+    body = s3_client.get_object(Bucket=entry['Bucket'], Key=entry['S3Key'])['Body'].read()
+    for line in gzip.decompress(body).decode('utf-8').splitlines():
+        if issue_id in line:
+            item = json.loads(line, parse_float=decimal.Decimal, parse_int=decimal.Decimal)
+            if item.get('IssueID') == issue_id:
+                return item
+    logger.warning(f"Archive index points {issue_id} at {entry['S3Key']} but the item is missing.")
+    return None
+
+
+def load_issue(issue_id, issues_table):
+    """Hot table first, then the archive. Returns the item or None."""
+    item = issues_table.get_item(Key={'IssueID': issue_id}).get('Item')
+    if item:
+        return item
+    try:
+        return load_archived_issue(issue_id)
+    except Exception as e:
+        logger.error(f"Archive lookup failed for {issue_id}: {e}")
+        return None
+
+
+def get_archived_counters(index_table=None):
+    """Returns ({status: count}, {priority: count}) for archived issues."""
+    index_table = index_table or get_index_table()
+    item = index_table.get_item(Key={'IssueID': COUNTERS_KEY}).get('Item') or {}
+    by_status, by_priority = {}, {}
+    for name, value in item.items():
+        if name.startswith('Status_'):
+            by_status[name[len('Status_'):]] = int(value)
+        elif name.startswith('Priority_'):
+            by_priority[name[len('Priority_'):]] = int(value)
+    return by_status, by_priority
@@ -0,0 +1,180 @@
+"""
+Moves issues that have been Completed for more than N days from CivicIssues into the archive.
+
+Usage (from the utility-layer/python directory), or scheduled via the IssueArchiver Lambda:
+    python -m civicbot_utils.archive_completed --days 30
+
+Order of operations per chunk: write the archive file, write the ID -> file index entries, then
+delete each hot row in a transaction that also bumps the archived counters. A row that changed
+since it was scanned (e.g. re-opened) fails its condition and stays hot. A crash only leaves
+extra archive copies behind, never a missing issue.
+"""
+import argparse
+import collections
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from civicbot_utils.archive import (
+    ARCHIVE_BUCKET, ARCHIVE_INDEX_TABLE, ARCHIVE_PREFIX, ARCHIVED_STATUS, COUNTERS_KEY
+)
+from civicbot_utils.bulk_read import DEFAULT_SEGMENTS, parallel_scan
+from civicbot_utils.http_pool import boto_config, pool_size_for
+from civicbot_utils.serialization import dumps
+
+logger = logging.getLogger()
+
+DEFAULT_DAYS = 30
+CHUNK_SIZE = 1000
+# Time kept in hand before starting another chunk (S3 writes + one transaction per item)
+CHUNK_TIME_RESERVE_SECONDS = int(os.environ.get('ARCHIVE_CHUNK_RESERVE_SECONDS', '120'))
+
+
+def completed_at(item):
+    return int(item.get('StatusLastModified') or item.get('Timestamp') or 0)
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_archivable(table, cutoff_ts, total_segments=None):
+    condition = Attr('Status').eq(ARCHIVED_STATUS) & (
+        Attr('StatusLastModified').lt(cutoff_ts)
+        | (Attr('StatusLastModified').not_exists() & Attr('Timestamp').lt(cutoff_ts))
+    )
+    return parallel_scan(table, total_segments=total_segments, FilterExpression=condition)
+
+
+def write_partitions(items, s3_client, run_id, chunk_no):
+    """Writes one gzip JSONL file per completion date. Returns {IssueID: s3_key}."""
+    by_date = collections.defaultdict(list)
+    for item in items:
+        day = datetime.fromtimestamp(completed_at(item), tz=timezone.utc).strftime('%Y-%m-%d')
+        by_date[day].append(item)
+
+    locations = {}
+    for day, day_items in by_date.items():
+        s3_key = f"{ARCHIVE_PREFIX}/dt={day}/part-{run_id}-{chunk_no:05d}.jsonl.gz"
+        body = gzip.compress(
+            "".join(dumps(item) + "\n" for item in day_items).encode('utf-8')
+        )
+        s3_client.put_object(Bucket=ARCHIVE_BUCKET, Key=s3_key, Body=body, ContentType='application/gzip')
+        locations.update({item['IssueID']: s3_key for item in day_items})
+    return locations
+
+
+def delete_and_count(dynamodb_client, table_name, index_table_name, item):
+    """Deletes the hot row and bumps the archived counters atomically. False if the row changed."""
+    status_lmt = item.get('StatusLastModified')
+    condition = "#s = :completed AND " + (
+        "StatusLastModified = :lmt" if status_lmt is not None else "attribute_not_exists(StatusLastModified)"
+    )
+    values = {':completed': {'S': ARCHIVED_STATUS}}
+    if status_lmt is not None:
+        values[':lmt'] = {'N': str(status_lmt)}
+    try:
+        dynamodb_client.transact_write_items(TransactItems=[
+            {'Delete': {
+                'TableName': table_name,
+                'Key': {'IssueID': {'S': item['IssueID']}},
+                'ConditionExpression': condition,
+                'ExpressionAttributeNames': {'#s': 'Status'},
+                'ExpressionAttributeValues': values
+            }},
+            {'Update': {
+                'TableName': index_table_name,
+                'Key': {'IssueID': {'S': COUNTERS_KEY}},
+                'UpdateExpression': "ADD #status :one, #priority :one",
+                'ExpressionAttributeNames': {
+                    '#status': f"Status_{ARCHIVED_STATUS}",
+                    '#priority': f"Priority_{item.get('Priority', 'Unknown')}"
+                },
+                'ExpressionAttributeValues': {':one': {'N': '1'}}
+            }}
+        ])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'TransactionCanceledException':
+            return False
+        raise
+
+
+def run_archive(issues_table, index_table, s3_client, days=DEFAULT_DAYS, total_segments=None, dry_run=False,
+                deadline=None):
+    """
+    Archives eligible issues chunk by chunk. With `deadline` (epoch seconds, e.g. the Lambda's end time)
+    it stops between chunks once less than CHUNK_TIME_RESERVE_SECONDS remain; the rest is left hot
+    for the next scheduled run, and totals['complete'] is False.
+    """
+    cutoff_ts = int(time.time()) - days * 86400
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+    dynamodb_client = issues_table.meta.client
+    totals = {'scanned': 0, 'archived': 0, 'skipped_changed': 0, 'files': 0, 'complete': True}
+
+    archivable = iter_archivable(issues_table, cutoff_ts, total_segments)
+    for chunk_no, chunk in enumerate(iter_chunks(archivable, CHUNK_SIZE)):
+        if deadline is not None and deadline - time.time() < CHUNK_TIME_RESERVE_SECONDS:
+            totals['complete'] = False
+            archivable.close() # Stops the remaining scan segments
+            break
+        totals['scanned'] += len(chunk)
+        if dry_run:
+            continue
+
+        locations = write_partitions(chunk, s3_client, run_id, chunk_no)
+        totals['files'] += len(set(locations.values()))
+        archived_at = int(time.time())
+        with index_table.batch_writer(overwrite_by_pkeys=['IssueID']) as batch:
+            for issue_id, s3_key in locations.items():
+                batch.put_item(Item={
+                    'IssueID': issue_id, 'Bucket': ARCHIVE_BUCKET, 'S3Key': s3_key, 'ArchivedAt': archived_at
+                })
+
+        # Index entries for rows that stay hot are harmless: lookups always try the hot table first
+        for item in chunk:
+            if delete_and_count(dynamodb_client, issues_table.name, index_table.name, item):
+                totals['archived'] += 1
+            else:
+                totals['skipped_changed'] += 1
+
+    logger.info(f"Archive run {run_id}: {totals}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive issues Completed for more than N days.")
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues'))
+    parser.add_argument('--region', default=os.environ.get('REGION', 'us-east-1'))
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--segments', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help="Only count archivable issues.")
+    args = parser.parse_args()
+
+    segments = args.segments or DEFAULT_SEGMENTS
+    dynamodb = boto3.resource('dynamodb', region_name=args.region, config=boto_config(max_pool_connections=pool_size_for(segments)))
+    s3_client = boto3.client('s3', region_name=args.region, config=boto_config())
+    totals = run_archive(
+        dynamodb.Table(args.table), dynamodb.Table(ARCHIVE_INDEX_TABLE), s3_client,
+        args.days, segments, args.dry_run
+    )
+    print(json.dumps(totals))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Sets StatusShard on existing CivicIssues items (run once after adding the sharded GSI,
+and again whenever STATUS_SHARD_COUNT changes).
+
+Usage (from the utility-layer/python directory):
+    python -m civicbot_utils.backfill_status_shards
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+from civicbot_utils.bulk_read import DEFAULT_SEGMENTS, parallel_scan
+from civicbot_utils.http_pool import boto_config, pool_size_for
+from civicbot_utils.status_shards import status_shard_key
+
+
+def set_shard(table, item):
+    """Only writes if Status is unchanged since the scan, so a concurrent admin update wins."""
+    expected = status_shard_key(item['Status'], item['IssueID'])
+    if item.get('StatusShard') == expected:
+        return False
+    try:
+        table.update_item(
+            Key={'IssueID': item['IssueID']},
+            UpdateExpression="SET StatusShard = :shard",
+            ConditionExpression="#s = :status",
+            ExpressionAttributeNames={'#s': 'Status'},
+            ExpressionAttributeValues={':shard': expected, ':status': item['Status']}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill StatusShard on CivicIssues.")
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues'))
+    parser.add_argument('--region', default=os.environ.get('REGION', 'us-east-1'))
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    # Scan threads and update workers share one client
+    config = boto_config(max_pool_connections=pool_size_for(DEFAULT_SEGMENTS + args.workers))
+    table = boto3.resource('dynamodb', region_name=args.region, config=config).Table(args.table)
+    items = parallel_scan(
+        table,
+        ProjectionExpression='IssueID, #s, StatusShard',
+        ExpressionAttributeNames={'#s': 'Status'}
+    )
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        updated = sum(executor.map(lambda item: set_shard(table, item), (i for i in items if i.get('Status'))))
+    print(f"StatusShard set on {updated} issues.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from civicbot_utils.http_pool import BOTO_MAX_POOL_CONNECTIONS
+
+# --- CONFIGURATION ---
+# Keep the segment count at or below the client's max_pool_connections (http_pool.boto_config(),
+# BOTO_MAX_POOL_CONNECTIONS), otherwise the extra threads just wait for a free HTTP connection.
+# Callers that pass more segments should size their client with http_pool.pool_size_for().
+DEFAULT_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '0')) or min(BOTO_MAX_POOL_CONNECTIONS, max(4, (os.cpu_count() or 1) * 2))
+PAGE_QUEUE_SIZE = 32
+_SEGMENT_DONE = object()
+
+
+def scan_segment(table, segment, total_segments, stop_event=None, **scan_kwargs):
+    """Yields every page of items for one scan segment, following LastEvaluatedKey."""
+    kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+    while True:
+        response = table.scan(**kwargs)
+        yield response.get('Items', [])
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or (stop_event is not None and stop_event.is_set()):
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def parallel_scan(table, total_segments=None, max_workers=None, **scan_kwargs):
+    """
+    Scans the whole table over N segments with a thread pool and yields items as pages arrive.
+    Extra keyword arguments (FilterExpression, ProjectionExpression, ...) are passed to every scan call.
+    Closing the generator early (e.g. `break` after the first match) stops the remaining segments.
+    """
+    total_segments = total_segments or DEFAULT_SEGMENTS
+    pages = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+    stop_event = threading.Event()
+
+    def publish(value):
+        # Bounded put that gives up once the consumer has gone away
+        while not stop_event.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def run_segment(segment):
+        try:
+            for items in scan_segment(table, segment, total_segments, stop_event, **scan_kwargs):
+                if stop_event.is_set():
+                    return
+                publish(items)
+        except Exception as e:
+            publish(e)
+        finally:
+            publish(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or total_segments)
+    try:
+        for segment in range(total_segments):
+            executor.submit(run_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=False)
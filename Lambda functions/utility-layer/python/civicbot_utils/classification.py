@@ -0,0 +1,121 @@
+"""
+Asynchronous priority classification for reports saved with Priority='PENDING'.
+
+handle_report_issue writes the issue and enqueues {'IssueID', 'IssueType'}; the PriorityClassifier
+worker classifies queued reports in micro-batches (one Bedrock call per batch) and updates them,
+writing (and alerting on) HIGH results before the rest. The worker also runs the community-validation
+check that the synchronous path does inline, and records its matches on the issue (SimilarIssues).
+Without CLASSIFICATION_QUEUE_URL an in-memory queue stands in for SQS so the flow can be tested and
+benchmarked offline.
+"""
+import collections
+import json
+import logging
+import os
+import threading
+
+from civicbot_utils.http_pool import boto_config
+from civicbot_utils.priority import FALLBACK_PRIORITY, PROMPT_VERSION, classify_issue_texts
+
+logger = logging.getLogger()
+
+PENDING_PRIORITY = 'PENDING'
+CLASSIFICATION_QUEUE_URL = os.environ.get('CLASSIFICATION_QUEUE_URL')
+MICRO_BATCH_SIZE = int(os.environ.get('CLASSIFICATION_BATCH_SIZE', '10'))
+
+_queue = None
+
+
+class SqsClassificationQueue:
+    """Producer side of the SQS queue that triggers the PriorityClassifier Lambda."""
+
+    def __init__(self, queue_url, sqs_client=None):
+        import boto3
+        self.queue_url = queue_url
+        self.sqs_client = sqs_client or boto3.client('sqs', config=boto_config())
+
+    def send(self, message):
+        self.sqs_client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+
+class InMemoryClassificationQueue:
+    """Local stand-in for SQS: FIFO, thread-safe, drained with receive()."""
+
+    def __init__(self):
+        self._messages = collections.deque()
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self._messages.append(message)
+
+    def receive(self, max_messages=MICRO_BATCH_SIZE):
+        with self._lock:
+            return [self._messages.popleft() for _ in range(min(max_messages, len(self._messages)))]
+
+    def __len__(self):
+        return len(self._messages)
+
+
+def get_classification_queue():
+    """SQS when CLASSIFICATION_QUEUE_URL is set, otherwise a per-process in-memory queue."""
+    global _queue
+    if _queue is None:
+        _queue = SqsClassificationQueue(CLASSIFICATION_QUEUE_URL) if CLASSIFICATION_QUEUE_URL else InMemoryClassificationQueue()
+    return _queue
+
+
+def write_classified_priority(table, issue_id, priority, similar_issues=None, prompt_version=None):
+    """
+    Only replaces PENDING, so a retried message never overwrites an admin's change.
+    prompt_version is stamped only for a real model answer (not the MEDIUM fallback).
+    """
+    update_expression = "SET Priority = :p"
+    values = {':p': priority, ':pending': PENDING_PRIORITY}
+    if prompt_version:
+        update_expression += ", PriorityPromptVersion = :v"
+        values[':v'] = prompt_version
+    if similar_issues:
+        update_expression += ", SimilarIssues = :similar"
+        values[':similar'] = similar_issues
+    try:
+        table.update_item(
+            Key={'IssueID': issue_id},
+            UpdateExpression=update_expression,
+            ConditionExpression="Priority = :pending",
+            ExpressionAttributeValues=values
+        )
+        return True
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            logger.info(f"Issue {issue_id} is no longer PENDING; skipping.")
+            return False
+        raise
+
+
+def classify_pending_batch(messages, table, bedrock_rt, model_id, on_high_priority=None, find_similar=None):
+    """
+    Classifies one micro-batch of queued reports and updates them.
+    HIGH results are written before everything else, and alerted (on_high_priority) only if this call
+    actually replaced PENDING: a redelivered batch or an issue an admin already handled is not re-alerted.
+    find_similar(issue_text) -> [matches], when given, is recorded on each issue with its priority.
+    Returns {IssueID: priority}. Raises if Bedrock fails so the queue redelivers the batch.
+    """
+    if not messages:
+        return {}
+    priorities = classify_issue_texts(bedrock_rt, model_id, [m['IssueType'] for m in messages])
+    results = [
+        # Same fallback as the synchronous path, left unversioned so the backfill retries it
+        (message, priority or FALLBACK_PRIORITY, PROMPT_VERSION if priority else None)
+        for message, priority in zip(messages, priorities)
+    ]
+    results.sort(key=lambda r: r[1] != 'HIGH')
+
+    classified = {}
+    for message, priority, prompt_version in results:
+        similar_issues = find_similar(message['IssueType']) if find_similar else None
+        written = write_classified_priority(table, message['IssueID'], priority, similar_issues, prompt_version)
+        if written and priority == 'HIGH' and on_high_priority:
+            on_high_priority(message)
+        classified[message['IssueID']] = priority
+    return classified
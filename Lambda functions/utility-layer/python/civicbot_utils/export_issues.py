@@ -0,0 +1,114 @@
+"""
+Exports the CivicIssues table to compressed files for offline analytics.
+
+Usage (from the utility-layer/python directory):
+    python -m civicbot_utils.export_issues --out ./export --format jsonl
+    python -m civicbot_utils.export_issues --out ./export --format parquet   # requires pyarrow
+"""
+import argparse
+import gzip
+import os
+
+import boto3
+
+from civicbot_utils.bulk_read import DEFAULT_SEGMENTS, parallel_scan
+from civicbot_utils.http_pool import boto_config, pool_size_for
+from civicbot_utils.serialization import dumps, to_plain
+
+ROWS_PER_FILE = 50000
+# Fixed Parquet schema, so every part file has the same columns and types and the directory reads as
+# one dataset. Attributes not listed here are kept, as a JSON object, in the Extra column.
+PARQUET_COLUMNS = [
+    ('IssueID', 'string'),
+    ('UserID', 'string'),
+    ('IssueType', 'string'),
+    ('UserLocation', 'string'),
+    ('Status', 'string'),
+    ('StatusShard', 'string'),
+    ('Priority', 'string'),
+    ('PriorityPromptVersion', 'int64'),
+    ('ExpectedCompletionDate', 'string'),
+    ('Timestamp', 'int64'),
+    ('StatusLastModified', 'int64'),
+    ('MediaAttached', 'string'),
+    ('Attachments', 'string'), # JSON list
+    ('SimilarIssues', 'string'), # JSON list
+]
+EXTRA_COLUMN = 'Extra'
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_jsonl(rows, path):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(dumps(row))
+            f.write('\n')
+
+
+def write_parquet(rows, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export requires pyarrow (pip install pyarrow), or use --format jsonl.")
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in PARQUET_COLUMNS] + [(EXTRA_COLUMN, pa.string())])
+    known = {name for name, _ in PARQUET_COLUMNS}
+
+    def cell(value, kind):
+        if value is None:
+            return None
+        if kind == 'int64':
+            return int(value)
+        return value if isinstance(value, str) else dumps(value)
+
+    data = {name: [cell(row.get(name), kind) for row in rows] for name, kind in PARQUET_COLUMNS}
+    data[EXTRA_COLUMN] = [
+        dumps(extra) if extra else None
+        for extra in ({k: v for k, v in row.items() if k not in known} for row in rows)
+    ]
+    pq.write_table(pa.table(data, schema=schema), path, compression='zstd')
+
+
+def export_issues(table, out_dir, fmt='jsonl', total_segments=None, rows_per_file=ROWS_PER_FILE):
+    """Streams the table through parallel_scan and writes part files. Returns (files, rows) written."""
+    os.makedirs(out_dir, exist_ok=True)
+    writer, extension = (write_parquet, 'parquet') if fmt == 'parquet' else (write_jsonl, 'jsonl.gz')
+
+    files, rows = 0, 0
+    items = (to_plain(item) for item in parallel_scan(table, total_segments=total_segments))
+    for chunk in _chunks(items, rows_per_file):
+        writer(chunk, os.path.join(out_dir, f"part-{files:05d}.{extension}"))
+        files += 1
+        rows += len(chunk)
+    return files, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export CivicIssues to compressed files.")
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues'))
+    parser.add_argument('--region', default=os.environ.get('REGION', 'us-east-1'))
+    parser.add_argument('--out', required=True, help="Output directory for the part files.")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--segments', type=int, default=None, help="Parallel scan segments.")
+    parser.add_argument('--rows-per-file', type=int, default=ROWS_PER_FILE)
+    args = parser.parse_args()
+
+    segments = args.segments or DEFAULT_SEGMENTS
+    dynamodb = boto3.resource('dynamodb', region_name=args.region, config=boto_config(max_pool_connections=pool_size_for(segments)))
+    table = dynamodb.Table(args.table)
+    files, rows = export_issues(table, args.out, args.format, segments, args.rows_per_file)
+    print(f"Exported {rows} issues into {files} file(s) under {args.out}")
+
+
+if __name__ == '__main__':
+    main()
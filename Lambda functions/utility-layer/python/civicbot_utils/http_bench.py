@@ -0,0 +1,168 @@
+"""
+Offline benchmark: a new connection per request (the old urllib.request.urlopen media download)
+vs a pooled keep-alive connection (http_pool.get_session()).
+
+Starts a local HTTPS server with a throwaway self-signed certificate (needs the openssl CLI, or
+use --plain). --rtt-ms simulates network distance: every round trip costs that much, so a fresh
+connection pays TCP + TLS setup (2 RTT with TLS 1.3) before its request (1 RTT).
+    python -m civicbot_utils.http_bench --requests 50 --rtt-ms 20
+"""
+import argparse
+import http.client
+import http.server
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+
+class BenchServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, rtt, payload, tls_context=None):
+        super().__init__(address, handler)
+        self.rtt = rtt
+        self.payload = payload
+        self.tls_context = tls_context
+        self.connections = 0
+
+    def get_request(self):
+        sock, address = super().get_request()
+        self.connections += 1
+        if self.tls_context:
+            # Handshake in the worker thread so a slow one does not block accept()
+            sock = self.tls_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        return sock, address
+
+    def process_request_thread(self, request, client_address):
+        time.sleep(self.rtt * (2 if self.tls_context else 1)) # connection setup round trips
+        if self.tls_context:
+            try:
+                request.do_handshake()
+            except (ssl.SSLError, OSError):
+                self.shutdown_request(request)
+                return
+        super().process_request_thread(request, client_address)
+
+
+class BenchHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive
+
+    def do_GET(self):
+        time.sleep(self.server.rtt) # request/response round trip
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(self.server.payload)))
+        self.end_headers()
+        self.wfile.write(self.server.payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_certificate(directory):
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=DNS:localhost', '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def time_requests(count, do_request):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        body = do_request()
+        latencies.append(time.perf_counter() - started)
+        assert body
+    return latencies
+
+
+def summarize(latencies, connections):
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'total_s': round(sum(latencies), 3),
+        'connections_opened': connections,
+    }
+
+
+def run(requests_count, rtt_ms, payload_kb, plain=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        server_ctx = client_ctx = None
+        cafile = None
+        if not plain:
+            cafile, key = make_certificate(tmp)
+            server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            server_ctx.load_cert_chain(cafile, key)
+            client_ctx = ssl.create_default_context(cafile=cafile)
+
+        server = BenchServer(('localhost', 0), BenchHandler, rtt_ms / 1000, b'x' * (payload_kb * 1024), server_ctx)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"{'http' if plain else 'https'}://localhost:{server.server_address[1]}/media"
+
+        # --- New connection per request (old handle_media_upload) ---
+        def fresh():
+            with urllib.request.urlopen(url, context=client_ctx) as response:
+                return response.read()
+
+        server.connections = 0
+        fresh_latencies = time_requests(requests_count, fresh)
+        fresh_connections = server.connections
+
+        # --- Pooled keep-alive: http_pool's session when requests is installed, else http.client ---
+        server.connections = 0
+        try:
+            from civicbot_utils import http_pool
+            session = http_pool.get_session()
+            session.verify = cafile if cafile else True
+            pooled_client = 'requests.Session (http_pool)'
+
+            def pooled():
+                return http_pool.fetch(url)
+        except ImportError:
+            conn_class = http.client.HTTPConnection if plain else http.client.HTTPSConnection
+            kwargs = {} if plain else {'context': client_ctx}
+            connection = conn_class('localhost', server.server_address[1], **kwargs)
+            pooled_client = 'http.client keep-alive (requests not installed)'
+
+            def pooled():
+                connection.request('GET', '/media')
+                return connection.getresponse().read()
+
+        pooled_latencies = time_requests(requests_count, pooled)
+        pooled_connections = server.connections
+        server.shutdown()
+
+    fresh_stats = summarize(fresh_latencies, fresh_connections)
+    pooled_stats = summarize(pooled_latencies, pooled_connections)
+    return {
+        'requests': requests_count,
+        'rtt_ms': rtt_ms,
+        'tls': not plain,
+        'pooled_client': pooled_client,
+        'new_connection_per_request': fresh_stats,
+        'pooled_keep_alive': pooled_stats,
+        'saved_per_request_ms': round(fresh_stats['mean_ms'] - pooled_stats['mean_ms'], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled keep-alive vs per-request HTTPS connections.")
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--rtt-ms', type=float, default=20.0, help="Simulated network round trip (ms).")
+    parser.add_argument('--payload-kb', type=int, default=64)
+    parser.add_argument('--plain', action='store_true', help="Plain HTTP (no openssl needed).")
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.rtt_ms, args.payload_kb, args.plain), indent=2))
+
+
+if __name__ == '__main__':
+    main()
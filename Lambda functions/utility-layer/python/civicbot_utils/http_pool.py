@@ -0,0 +1,87 @@
+"""
+Keep-alive HTTP connections shared across warm invocations.
+
+  * get_session(): one requests.Session per container. Its pooled HTTPAdapter is used for Twilio
+    API calls (get_twilio_client) and media downloads (fetch), so repeat requests to the same host
+    skip the TCP + TLS handshake.
+  * boto_config(): botocore Config for every boto3 client/resource, with a connection pool sized
+    for the parallel scans and shard fan-out (the botocore default of 10 is smaller than
+    SCAN_SEGMENTS + STATUS_SHARD_COUNT workers, and the surplus connections are discarded).
+
+Environment:
+  HTTP_POOL_MAXSIZE            connections kept per host (default 10)
+  HTTP_CONNECT_TIMEOUT         seconds (default 3)
+  HTTP_READ_TIMEOUT            seconds (default 15)
+  BOTO_MAX_POOL_CONNECTIONS    botocore pool size per client (default 25)
+  BOTO_CONNECT_TIMEOUT         seconds (default 3)
+"""
+import os
+
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '10'))
+POOL_HOSTS = 4 # api.twilio.com plus the media hosts Twilio redirects to
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '3'))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '15'))
+BOTO_MAX_POOL_CONNECTIONS = int(os.environ.get('BOTO_MAX_POOL_CONNECTIONS', '25'))
+BOTO_CONNECT_TIMEOUT = float(os.environ.get('BOTO_CONNECT_TIMEOUT', '3'))
+
+_session = None
+_twilio_clients = {}
+
+
+def get_session():
+    """Container-wide requests.Session with a tuned keep-alive pool (created on first use)."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Only idempotent GETs are retried; a retried Twilio POST could send a message twice
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(['GET', 'HEAD']))
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=retries)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def fetch(url, timeout=None):
+    """GETs `url` over the pooled session and returns the body bytes (raises on HTTP errors)."""
+    response = get_session().get(url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+    response.raise_for_status()
+    return response.content
+
+
+def get_twilio_client(account_sid, auth_token):
+    """Twilio REST client whose requests go through the shared pooled session."""
+    client = _twilio_clients.get(account_sid)
+    if client is None:
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        http_client = TwilioHttpClient(pool_connections=True, timeout=READ_TIMEOUT)
+        http_client.session = get_session()
+        client = Client(account_sid, auth_token, http_client=http_client)
+        _twilio_clients[account_sid] = client
+    return client
+
+
+def pool_size_for(threads):
+    """max_pool_connections for a client shared by `threads` concurrent callers (never below the default)."""
+    return max(BOTO_MAX_POOL_CONNECTIONS, threads)
+
+
+def boto_config(**overrides):
+    """botocore Config with keep-alive and a larger pool; pass overrides (e.g. read_timeout) per client."""
+    from botocore.config import Config
+
+    settings = {
+        'max_pool_connections': BOTO_MAX_POOL_CONNECTIONS,
+        'connect_timeout': BOTO_CONNECT_TIMEOUT,
+        'tcp_keepalive': True,
+        'retries': {'mode': 'standard'},
+    }
+    settings.update(overrides)
+    return Config(**settings)
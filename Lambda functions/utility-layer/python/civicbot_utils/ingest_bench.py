@@ -0,0 +1,107 @@
+"""
+Offline benchmark: synchronous vs queued (micro-batched) priority classification.
+
+Uses the in-memory queue, a dict-backed table and a fake Bedrock client with a fixed latency,
+so no AWS access is needed:
+    python -m civicbot_utils.ingest_bench --reports 200 --model-latency 0.5 --batch-size 10
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+
+from civicbot_utils.classification import (
+    PENDING_PRIORITY, InMemoryClassificationQueue, classify_pending_batch
+)
+from civicbot_utils.priority import build_priority_prompt
+
+SAMPLE_ISSUES = ['sewage leak near school', 'flickering street light', 'faded zebra crossing paint', 'road collapse']
+
+
+class FakeBedrock:
+    """Answers single and batched priority prompts after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke_model(self, body, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        text = json.loads(body)['inputText']
+        if 'Issues: ' not in text:
+            output = 'HIGH' if 'sewage' in text or 'collapse' in text else 'LOW'
+        else:
+            parts = text.split('Issues: ', 1)[1].split('[')[1:]
+            output = "\n".join(
+                f"{i}: {'HIGH' if 'sewage' in p or 'collapse' in p else 'LOW'}" for i, p in enumerate(parts, 1)
+            )
+        return {'body': io.BytesIO(json.dumps({'results': [{'outputText': output}]}).encode())}
+
+
+class FakeTable:
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item):
+        self.items[Item['IssueID']] = dict(Item)
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        item = self.items[Key['IssueID']]
+        if item.get('Priority') == ExpressionAttributeValues.get(':pending', item.get('Priority')):
+            item['Priority'] = ExpressionAttributeValues[':p']
+
+
+def run(reports, model_latency, batch_size):
+    texts = [SAMPLE_ISSUES[i % len(SAMPLE_ISSUES)] for i in range(reports)]
+
+    # --- Synchronous: each confirmation waits for its own Bedrock call ---
+    bedrock, table = FakeBedrock(model_latency), FakeTable()
+    sync_latencies = []
+    for i, text in enumerate(texts):
+        started = time.perf_counter()
+        bedrock.invoke_model(body=json.dumps({'inputText': build_priority_prompt(text)}))
+        table.put_item(Item={'IssueID': f'sync{i}', 'IssueType': text, 'Priority': 'HIGH'})
+        sync_latencies.append(time.perf_counter() - started)
+    sync_calls = bedrock.calls
+
+    # --- Queued: confirm after put + enqueue, then drain in micro-batches ---
+    bedrock, table, queue = FakeBedrock(model_latency), FakeTable(), InMemoryClassificationQueue()
+    async_latencies = []
+    for i, text in enumerate(texts):
+        started = time.perf_counter()
+        table.put_item(Item={'IssueID': f'async{i}', 'IssueType': text, 'Priority': PENDING_PRIORITY})
+        queue.send({'IssueID': f'async{i}', 'IssueType': text})
+        async_latencies.append(time.perf_counter() - started)
+
+    drain_started = time.perf_counter()
+    high_alerts = []
+    while len(queue):
+        classify_pending_batch(queue.receive(batch_size), table, bedrock, 'fake-model', high_alerts.append)
+    drain_seconds = time.perf_counter() - drain_started
+
+    pending_left = sum(1 for item in table.items.values() if item['Priority'] == PENDING_PRIORITY)
+    return {
+        'reports': reports,
+        'sync_confirm_p50_ms': round(statistics.median(sync_latencies) * 1000, 3),
+        'async_confirm_p50_ms': round(statistics.median(async_latencies) * 1000, 3),
+        'sync_bedrock_calls': sync_calls,
+        'async_bedrock_calls': bedrock.calls,
+        'async_drain_seconds': round(drain_seconds, 3),
+        'high_alerts': len(high_alerts),
+        'pending_left': pending_left,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark queued vs synchronous report classification.")
+    parser.add_argument('--reports', type=int, default=200)
+    parser.add_argument('--model-latency', type=float, default=0.05, help="Simulated Bedrock latency (s).")
+    parser.add_argument('--batch-size', type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.reports, args.model_latency, args.batch_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Citizen-facing message text shared by CivicBotHandler and the WhatsApp_Connector fast path."""
+
+
+def format_status_message(item):
+    """Formats a CivicIssues item into the TrackStatus reply."""
+    completion_date = item.get('ExpectedCompletionDate', 'Under Review')
+    return (
+        f"🚨 *Civic Report Status* 🚨\n\n"
+        f"*ID:* {item['IssueID']}\n"
+        f"*Issue:* {item.get('IssueType', 'N/A')}\n"
+        f"*Current Status:* {item['Status'].upper()}\n"
+        f"*Priority:* {item.get('Priority', 'N/A')}\n"
+        f"*Expected Completion:* {completion_date}"
+    )
+
+
+REPORT_LIMIT_MESSAGE = (
+    "You've filed several reports in a short time, so we can't take another one just now. "
+    "Please try again later. Your earlier reports are safe."
+)
+
+
+def status_not_found_message(tracking_id):
+    return f"Sorry, I could not find a report with the ID **{tracking_id}**. Please double-check the ID."
+
+
+def rating_feedback(rating):
+    """Returns (fulfillment_state, message) for a RateService score."""
+    try:
+        rating_val = int(rating)
+    except (ValueError, TypeError):
+        return 'Failed', "Please provide a valid numeric rating between 1 and 5."
+
+    if not 1 <= rating_val <= 5:
+        return 'Failed', "Please rate service on a scale of 1 to 5."
+
+    # In production, you would associate this rating with a specific issue ID/User ID.
+    feedback_msg = "Thank you for your feedback! Your rating helps us improve service quality."
+    if rating_val <= 2:
+        feedback_msg += " We are sorry the service was poor and will review this with the team."
+    return 'Fulfilled', feedback_msg
@@ -0,0 +1,161 @@
+"""
+Durable outbox for citizen WhatsApp notifications.
+
+StatusNotifier turns each notifiable stream record into a row in NOTIFICATION_OUTBOX_TABLE
+(partition key IssueID, sort key Transition, e.g. "Processing@1712345678"). The write is
+conditional, so a redelivered stream batch never queues the same notification twice.
+NotificationSender then moves each row through:
+
+    PENDING -> SENDING (claimed; the lease expiry is kept in NextAttemptAt) -> SENT (TwilioSid, SentAt)
+                                                                          -> RETRY (exponential backoff) -> SENDING ...
+                                                                          -> DEAD (copied to the dead-letter table)
+
+NextAttemptAt is removed once a row is SENT or DEAD, so the sparse OUTBOX_STATE_INDEX
+(partition key State, sort key NextAttemptAt) lists exactly the work that is due. A worker that
+dies mid-send leaves its row in SENDING until the lease expires, then the sweep picks it up again.
+Delivery is therefore at-least-once.
+"""
+import logging
+import os
+import random
+import time
+
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+OUTBOX_TABLE = os.environ.get('NOTIFICATION_OUTBOX_TABLE', 'CivicNotificationOutbox')
+DEAD_LETTER_TABLE = os.environ.get('NOTIFICATION_DEAD_LETTER_TABLE', 'CivicNotificationDeadLetter')
+OUTBOX_STATE_INDEX = 'State-NextAttemptAt-index'
+MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', '6'))
+BACKOFF_BASE_SECONDS = int(os.environ.get('NOTIFICATION_BACKOFF_BASE', '30'))
+BACKOFF_MAX_SECONDS = int(os.environ.get('NOTIFICATION_BACKOFF_MAX', '3600'))
+LEASE_SECONDS = 120
+
+PENDING, SENDING, RETRY, SENT, DEAD = 'PENDING', 'SENDING', 'RETRY', 'SENT', 'DEAD'
+DUE_STATES = (PENDING, RETRY, SENDING)
+
+
+def transition_key(new_status, changed_at):
+    return f"{new_status}@{changed_at}"
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter: ~base, 2*base, 4*base ... capped at BACKOFF_MAX_SECONDS."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return int(delay / 2 + random.uniform(0, delay / 2))
+
+
+def _is_conditional_failure(table, error):
+    return isinstance(error, table.meta.client.exceptions.ConditionalCheckFailedException)
+
+
+def enqueue(table, issue_id, transition, recipient, message, created_at):
+    """Writes a PENDING outbox row. Returns False if this transition was already queued."""
+    try:
+        table.put_item(
+            Item={
+                'IssueID': issue_id,
+                'Transition': transition,
+                'Recipient': recipient,
+                'Message': message,
+                'State': PENDING,
+                'Attempts': 0,
+                'CreatedAt': int(created_at),
+                'NextAttemptAt': int(created_at)
+            },
+            ConditionExpression="attribute_not_exists(Transition)"
+        )
+        return True
+    except Exception as e:
+        if _is_conditional_failure(table, e):
+            return False
+        raise
+
+
+def claim(table, issue_id, transition, now=None):
+    """Leases a due row for sending. Returns the updated row, or None if it is not due or already taken."""
+    now = int(now or time.time())
+    try:
+        response = table.update_item(
+            Key={'IssueID': issue_id, 'Transition': transition},
+            UpdateExpression="SET #state = :sending, NextAttemptAt = :lease ADD Attempts :one",
+            ConditionExpression="#state IN (:pending, :retry, :sending) AND NextAttemptAt <= :now",
+            ExpressionAttributeNames={'#state': 'State'},
+            ExpressionAttributeValues={
+                ':sending': SENDING, ':pending': PENDING, ':retry': RETRY,
+                ':lease': now + LEASE_SECONDS, ':now': now, ':one': 1
+            },
+            ReturnValues='ALL_NEW'
+        )
+        return response['Attributes']
+    except Exception as e:
+        if _is_conditional_failure(table, e):
+            return None
+        raise
+
+
+def _owned_update(table, item, update_expression, values, names=None):
+    """Applies an update only if `item` is still the lease we claimed (a reclaimed row is left alone)."""
+    try:
+        table.update_item(
+            Key={'IssueID': item['IssueID'], 'Transition': item['Transition']},
+            UpdateExpression=update_expression,
+            ConditionExpression="#state = :sending AND Attempts = :attempts",
+            ExpressionAttributeNames={'#state': 'State', **(names or {})},
+            ExpressionAttributeValues={':sending': SENDING, ':attempts': item['Attempts'], **values}
+        )
+        return True
+    except Exception as e:
+        if _is_conditional_failure(table, e):
+            logger.warning(f"Outbox row {item['IssueID']}/{item['Transition']} was reclaimed; not updating.")
+            return False
+        raise
+
+
+def mark_sent(table, item, twilio_sid, now=None):
+    now = int(now or time.time())
+    return _owned_update(
+        table, item,
+        "SET #state = :sent, TwilioSid = :sid, SentAt = :now REMOVE NextAttemptAt, LastError",
+        {':sent': SENT, ':sid': twilio_sid, ':now': now}
+    )
+
+
+def mark_failed(table, dead_letter_table, item, error, permanent=False, now=None):
+    """Schedules a retry, or dead-letters the row when it is poison or out of attempts. Returns the new state."""
+    now = int(now or time.time())
+    error_text = str(error)[:1000]
+    if permanent or int(item['Attempts']) >= MAX_ATTEMPTS:
+        dead_letter_table.put_item(Item={**item, 'State': DEAD, 'LastError': error_text, 'DeadAt': now})
+        _owned_update(
+            table, item,
+            "SET #state = :dead, LastError = :error, DeadAt = :now REMOVE NextAttemptAt",
+            {':dead': DEAD, ':error': error_text, ':now': now}
+        )
+        return DEAD
+
+    _owned_update(
+        table, item,
+        "SET #state = :retry, LastError = :error, NextAttemptAt = :next",
+        {':retry': RETRY, ':error': error_text, ':next': now + backoff_seconds(int(item['Attempts']))}
+    )
+    return RETRY
+
+
+def iter_due(table, now=None):
+    """Yields (IssueID, Transition) for every row whose NextAttemptAt has passed."""
+    now = int(now or time.time())
+    for state in DUE_STATES:
+        query_kwargs = {
+            'IndexName': OUTBOX_STATE_INDEX,
+            'KeyConditionExpression': Key('State').eq(state) & Key('NextAttemptAt').lte(now),
+            'ProjectionExpression': 'IssueID, Transition'
+        }
+        while True:
+            response = table.query(**query_kwargs)
+            for item in response.get('Items', []):
+                yield item['IssueID'], item['Transition']
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,76 @@
+"""Bedrock priority prompts shared by CivicBotHandler, the PriorityClassifier worker and the backfill."""
+import json
+import re
+
+PRIORITY_LEVELS = ('HIGH', 'MEDIUM', 'LOW')
+FALLBACK_PRIORITY = 'MEDIUM'
+# Bump whenever the rubric below changes so the backfill can find items classified with an older prompt
+PROMPT_VERSION = 1
+MAX_ISSUE_CHARS = 300 # Keeps a full batch well inside the Titan Text Express context window
+OUTPUT_TOKENS_PER_ISSUE = 8
+
+RUBRIC = (
+    "HIGH is for health/safety crises (e.g., sewage leak, road collapse). "
+    "MEDIUM is for non-critical safety/service (e.g., flickering light, minor debris). "
+    "LOW is for aesthetic/maintenance only (e.g., faded paint, small weeds). "
+)
+
+_BATCH_LINE = re.compile(r'^\s*\[?(\d+)\]?\s*[:.)-]\s*\**(HIGH|MEDIUM|LOW)\b', re.IGNORECASE | re.MULTILINE)
+
+
+def build_priority_prompt(issue_text):
+    """Single-issue Titan prompt (flattened to one line to avoid newline errors)."""
+    prompt_instruction = (
+        "Classify the following issue as one word: HIGH, MEDIUM, or LOW. "
+        + RUBRIC +
+        f"Issue: {issue_text} Priority:"
+    )
+    return "User: " + prompt_instruction.strip() + " Assistant:"
+
+
+def parse_priority(output_text, default=FALLBACK_PRIORITY):
+    """Reads the first word of a single-issue answer; anything unexpected returns `default` (MEDIUM)."""
+    words = (output_text or '').split()
+    priority_word = words[0].upper().strip(' .,:*') if words else ''
+    return priority_word if priority_word in PRIORITY_LEVELS else default
+
+
+def build_batch_priority_prompt(issue_texts):
+    """Packs several issues into one prompt; the model answers one numbered line per issue."""
+    numbered = " ".join(f"[{i}] {' '.join(text.split())}" for i, text in enumerate(issue_texts, 1))
+    prompt_instruction = (
+        "Classify each numbered issue below as HIGH, MEDIUM, or LOW. "
+        + RUBRIC +
+        "Answer with exactly one line per issue in the form '<number>: <PRIORITY>' and nothing else. "
+        f"Issues: {numbered}"
+    )
+    return "User: " + prompt_instruction.strip() + " Assistant:"
+
+
+def parse_batch_priorities(output_text, count):
+    """Returns a list of `count` priorities; entries the model did not answer are None (not MEDIUM)."""
+    results = [None] * count
+    for match in _BATCH_LINE.finditer(output_text or ''):
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and results[index] is None:
+            results[index] = match.group(2).upper()
+    return results
+
+
+def classify_issue_texts(bedrock_rt, model_id, issue_texts):
+    """One Bedrock call for a batch of issue texts; returns a priority (or None if unanswered) per text."""
+    texts = [text[:MAX_ISSUE_CHARS] for text in issue_texts]
+    response = bedrock_rt.invoke_model(
+        modelId=model_id,
+        contentType='application/json',
+        accept='application/json',
+        body=json.dumps({
+            "inputText": build_batch_priority_prompt(texts),
+            "textGenerationConfig": {
+                "maxTokenCount": OUTPUT_TOKENS_PER_ISSUE * len(texts) + 16,
+                "temperature": 0.0,
+            }
+        })
+    )
+    output = json.loads(response.get('body').read()).get('results', [{}])[0].get('outputText', '')
+    return parse_batch_priorities(output, len(texts))
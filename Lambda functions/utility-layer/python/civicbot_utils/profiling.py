@@ -0,0 +1,138 @@
+"""
+Opt-in, sampled profiling for lambda_handler functions.
+
+    from civicbot_utils.profiling import profiled
+
+    @profiled
+    def lambda_handler(event, context): ...
+
+Environment:
+  PROFILE_SAMPLE_RATE   fraction of invocations to profile (default 0 = off; the handler is returned
+                        undecorated, so there is no per-call overhead at all)
+  PROFILE_SINK          s3://bucket/prefix or a local directory (default /tmp/civicbot-profiles)
+  PROFILE_TOP_N         rows kept from the cProfile and tracemalloc listings (default 30)
+
+Each sampled invocation writes <function>/<date>/<request-id>.json.gz (timings, cProfile listing,
+tracemalloc peak and top allocations) and a matching .prof.gz with the raw pstats data, which can
+be opened with `pstats.Stats` after gunzipping.
+"""
+import cProfile
+import functools
+import gzip
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger()
+
+SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SINK = os.environ.get('PROFILE_SINK', '/tmp/civicbot-profiles')
+TOP_N = int(os.environ.get('PROFILE_TOP_N', '30'))
+
+_s3_client = None
+
+
+def _write(relative_key, payload):
+    """Writes gzip-compressed bytes to the configured sink (S3 prefix or local directory)."""
+    global _s3_client
+    body = gzip.compress(payload)
+    if PROFILE_SINK.startswith('s3://'):
+        bucket, _, prefix = PROFILE_SINK[len('s3://'):].partition('/')
+        if _s3_client is None:
+            import boto3
+            from civicbot_utils.http_pool import boto_config
+            _s3_client = boto3.client('s3', config=boto_config())
+        key = f"{prefix.rstrip('/')}/{relative_key}" if prefix else relative_key
+        _s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType='application/gzip')
+    else:
+        path = os.path.join(PROFILE_SINK, relative_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+
+
+def _build_report(name, request_id, duration_ms, profiler, peak_bytes, snapshot):
+    listing = io.StringIO()
+    stats = pstats.Stats(profiler, stream=listing)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_N)
+
+    top_allocations = [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_bytes': stat.size,
+            'count': stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:TOP_N]
+    ] if snapshot else []
+
+    report = {
+        'function': name,
+        'request_id': request_id,
+        'captured_at': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(duration_ms, 3),
+        'tracemalloc_peak_bytes': peak_bytes,
+        'tracemalloc_top': top_allocations,
+        'cprofile_cumulative': listing.getvalue()
+    }
+    return report, marshal.dumps(stats.stats)
+
+
+def profile_call(func, name, event, context):
+    """Runs one invocation under cProfile + tracemalloc and ships the report to the sink."""
+    request_id = getattr(context, 'aws_request_id', None) or uuid.uuid4().hex
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(event, context)
+    finally:
+        profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+        if started_tracemalloc:
+            tracemalloc.stop()
+        try:
+            report, raw_stats = _build_report(name, request_id, duration_ms, profiler, peak_bytes, snapshot)
+            base_key = f"{name}/{datetime.now(timezone.utc):%Y-%m-%d}/{request_id}"
+            _write(f"{base_key}.json.gz", json.dumps(report).encode('utf-8'))
+            _write(f"{base_key}.prof.gz", raw_stats)
+        except Exception as e:
+            # Profiling must never fail the invocation itself
+            logger.error(f"Writing profile for {name} failed: {e}")
+
+
+def profiled(func=None, *, sample_rate=None, name=None):
+    """Decorator: profiles a sampled fraction of calls to a (event, context) handler."""
+    if func is None:
+        return functools.partial(profiled, sample_rate=sample_rate, name=name)
+
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0:
+        return func
+
+    profile_name = name or os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or func.__module__
+
+    @functools.wraps(func)
+    def wrapper(event, context):
+        if random.random() >= rate:
+            return func(event, context)
+        return profile_call(func, profile_name, event, context)
+
+    return wrapper
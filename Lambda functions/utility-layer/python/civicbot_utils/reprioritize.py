@@ -0,0 +1,207 @@
+"""
+Re-classifies issue priorities with Bedrock in batches (backfill for the MEDIUM fallback or prompt changes).
+
+Usage (from the utility-layer/python directory):
+    python -m civicbot_utils.reprioritize --checkpoint reprioritize.ckpt              # MEDIUM fallbacks + stale PENDING
+    python -m civicbot_utils.reprioritize --all --checkpoint reprioritize.ckpt        # anything below PROMPT_VERSION
+
+Every live writer (handle_report_issue, the PriorityClassifier worker) stamps PriorityPromptVersion
+on a real model answer, so unversioned MEDIUM items are fallbacks. The default run also picks up
+issues still PENDING after --pending-minutes, e.g. when their SQS message went to the dead-letter queue.
+
+Each Bedrock call classifies up to --batch-size issues; calls run --concurrency at a time and are
+throttled to --rate requests/second. Updates are conditional on the priority not having changed since
+it was read, so admin edits and the live handler are never overwritten. Processed IssueIDs are appended
+to the checkpoint file, and a re-run skips them.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from civicbot_utils.bulk_read import DEFAULT_SEGMENTS, parallel_scan
+from civicbot_utils.classification import PENDING_PRIORITY
+from civicbot_utils.http_pool import boto_config, pool_size_for
+from civicbot_utils.priority import PROMPT_VERSION, classify_issue_texts
+
+DEFAULT_MODEL_ID = 'amazon.titan-text-express-v1'
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_PENDING_MINUTES = 30
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads: at most `rate` acquisitions per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def iter_candidates(table, reclassify_all=False, done_ids=frozenset(), total_segments=None,
+                    pending_minutes=DEFAULT_PENDING_MINUTES):
+    """Streams (IssueID, IssueType, Priority) for issues that still need a (re)classification."""
+    outdated = Attr('PriorityPromptVersion').not_exists() | Attr('PriorityPromptVersion').lt(PROMPT_VERSION)
+    # Reports the queued worker never classified (message dead-lettered); fresh ones are left to the worker
+    stale_pending = Attr('Priority').eq(PENDING_PRIORITY) & Attr('Timestamp').lt(int(time.time()) - pending_minutes * 60)
+    if reclassify_all:
+        condition = (outdated & Attr('Priority').ne(PENDING_PRIORITY)) | stale_pending
+    else:
+        condition = (Attr('Priority').eq('MEDIUM') & outdated) | stale_pending
+    items = parallel_scan(
+        table,
+        total_segments=total_segments,
+        ProjectionExpression='IssueID, IssueType, Priority',
+        FilterExpression=condition
+    )
+    for item in items:
+        if item['IssueID'] not in done_ids and item.get('IssueType'):
+            yield item
+
+
+def write_priority(table, issue, priority):
+    """Conditional write: only applies if nobody changed the priority since we read it."""
+    try:
+        table.update_item(
+            Key={'IssueID': issue['IssueID']},
+            UpdateExpression="SET Priority = :new, PriorityPromptVersion = :v",
+            ConditionExpression="attribute_exists(IssueID) AND Priority = :old",
+            ExpressionAttributeValues={':new': priority, ':old': issue.get('Priority'), ':v': PROMPT_VERSION}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def process_batch(table, bedrock_rt, model_id, limiter, issues):
+    """
+    Classifies and writes one batch; returns (processed_ids, counts).
+    Unanswered issues are left out of processed_ids so a re-run picks them up again.
+    """
+    limiter.acquire()
+    processed_ids = []
+    counts = {'changed': 0, 'unchanged': 0, 'unanswered': 0, 'conflicts': 0}
+    for issue, priority in zip(issues, classify_issue_texts(bedrock_rt, model_id, [i['IssueType'] for i in issues])):
+        if priority is None:
+            counts['unanswered'] += 1
+            continue
+        processed_ids.append(issue['IssueID'])
+        if write_priority(table, issue, priority):
+            counts['changed' if priority != issue.get('Priority') else 'unchanged'] += 1
+        else:
+            counts['conflicts'] += 1
+    return processed_ids, counts
+
+
+def run_backfill(table, bedrock_rt, model_id=DEFAULT_MODEL_ID, batch_size=DEFAULT_BATCH_SIZE, concurrency=8,
+                 rate=5.0, reclassify_all=False, checkpoint_path=None, total_segments=None,
+                 pending_minutes=DEFAULT_PENDING_MINUTES):
+    """Streams candidates into batches and keeps at most 2x`concurrency` batches in flight."""
+    done_ids = load_checkpoint(checkpoint_path)
+    limiter = RateLimiter(rate)
+    totals = {'changed': 0, 'unchanged': 0, 'unanswered': 0, 'conflicts': 0, 'failed_batches': 0}
+    checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+    started_at = time.time()
+
+    def collect(done_futures):
+        for future in done_futures:
+            try:
+                processed_ids, counts = future.result()
+            except Exception as e:
+                # The batch is not checkpointed, so a re-run retries it
+                print(f"Batch failed: {e}")
+                totals['failed_batches'] += 1
+                continue
+            for key, value in counts.items():
+                totals[key] += value
+            if checkpoint:
+                checkpoint.writelines(f"{issue_id}\n" for issue_id in processed_ids)
+                checkpoint.flush()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            batch = []
+            for issue in iter_candidates(table, reclassify_all, done_ids, total_segments, pending_minutes):
+                batch.append(issue)
+                if len(batch) < batch_size:
+                    continue
+                pending.add(executor.submit(process_batch, table, bedrock_rt, model_id, limiter, batch))
+                batch = []
+                if len(pending) >= concurrency * 2:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+            if batch:
+                pending.add(executor.submit(process_batch, table, bedrock_rt, model_id, limiter, batch))
+            collect(concurrent.futures.as_completed(pending))
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    totals['elapsed_seconds'] = round(time.time() - started_at, 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch re-prioritize CivicIssues with Bedrock.")
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE_NAME', 'CivicIssues'))
+    parser.add_argument('--region', default=os.environ.get('REGION', 'us-east-1'))
+    parser.add_argument('--model-id', default=os.environ.get('BEDROCK_MODEL_ID', DEFAULT_MODEL_ID))
+    parser.add_argument('--all', action='store_true', help="Reclassify every issue below the current PROMPT_VERSION.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Issues packed into one prompt.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Bedrock calls in flight.")
+    parser.add_argument('--rate', type=float, default=5.0, help="Max Bedrock calls per second.")
+    parser.add_argument('--segments', type=int, default=None, help="Parallel scan segments.")
+    parser.add_argument('--checkpoint', default=None, help="File of processed IssueIDs for resume.")
+    parser.add_argument('--pending-minutes', type=int, default=DEFAULT_PENDING_MINUTES,
+                        help="Also classify issues still PENDING after this many minutes.")
+    args = parser.parse_args()
+
+    segments = args.segments or DEFAULT_SEGMENTS
+    # Scan threads and the batch workers' conditional writes share one client
+    dynamodb = boto3.resource(
+        'dynamodb', region_name=args.region,
+        config=boto_config(max_pool_connections=pool_size_for(segments + args.concurrency))
+    )
+    table = dynamodb.Table(args.table)
+    bedrock_rt = boto3.client(
+        'bedrock-runtime',
+        region_name=args.region,
+        config=boto_config(max_pool_connections=pool_size_for(args.concurrency), retries={'mode': 'adaptive', 'max_attempts': 8})
+    )
+    totals = run_backfill(table, bedrock_rt, args.model_id, args.batch_size, args.concurrency, args.rate,
+                          args.all, args.checkpoint, segments, args.pending_minutes)
+    print(json.dumps(totals))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+JSON serialization for DynamoDB items, shared by every Lambda.
+
+    from civicbot_utils.serialization import dumps
+    body = dumps(items)
+
+boto3 returns numbers as decimal.Decimal and string/number sets as Python sets. Both are mapped the
+same way by every backend (Decimal -> int when integral, else float; set -> sorted list), and the
+output is compact UTF-8 JSON with the same numbers whichever backend is used.
+
+dumps() hands the items straight to the encoder, which calls a default hook for Decimals and sets
+only; strings never go through Python code. orjson is part of the layer build (see Setup.md) and is
+what makes this faster than the old encoders. The json module fallback is roughly on par with the
+old number encoder and slower than the old str encoder. to_plain() does the same mapping as a
+standalone pass, for callers that need plain values (the JSONL/Parquet export in export_issues).
+
+JSON_BACKEND selects the encoder: 'auto' (default; orjson when it is installed), 'orjson' or 'json'.
+Values orjson cannot encode (e.g. integers wider than 64 bits) fall back to the standard library.
+"""
+import json
+import logging
+import os
+from decimal import Decimal
+
+try:
+    import orjson # Installed with the utility layer (Setup.md); the json module is the fallback
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger()
+
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+if JSON_BACKEND != 'json' and orjson is None:
+    logger.warning("orjson is not installed in the layer; using the slower json module.")
+USE_ORJSON = orjson is not None and JSON_BACKEND in ('auto', 'orjson')
+
+def decimal_to_number(value):
+    """Decimal -> int when integral (exact, any size), else float."""
+    # Not float(value).is_integer(): large non-integral Decimals round to an integral float
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def _plain_dict(item):
+    # Hot loop for item attributes: strings and Decimals are handled inline, without a call per value
+    plain = {}
+    for key, value in item.items():
+        value_type = type(value)
+        if value_type is str:
+            plain[key] = value
+        elif value_type is Decimal:
+            plain[key] = int(value) if value == value.to_integral_value() else float(value)
+        else:
+            plain[key] = to_plain(value)
+    return plain
+
+
+def to_plain(value):
+    """Returns a copy of a DynamoDB value built only from JSON types."""
+    value_type = type(value)
+    if value_type is dict:
+        return _plain_dict(value)
+    if value_type is list or value_type is tuple:
+        return [to_plain(v) for v in value]
+    if value_type is Decimal:
+        return decimal_to_number(value)
+    if value_type is set or value_type is frozenset:
+        return sorted(to_plain(v) for v in value)
+    return value
+
+
+def _json_default(value):
+    value_type = type(value)
+    if value_type is Decimal:
+        return decimal_to_number(value)
+    if value_type is set or value_type is frozenset:
+        return sorted(value) # Members are then encoded (via this hook) like any other value
+    raise TypeError(f"Object of type {value_type.__name__} is not JSON serializable")
+
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+def _dumps_json(value):
+    return _json_encoder.encode(value)
+
+
+def dumps(value):
+    """Serializes DynamoDB items (or anything built from them) to a JSON string."""
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(value, default=_json_default).decode('utf-8')
+        except TypeError: # orjson.JSONEncodeError subclasses TypeError
+            pass
+    return _dumps_json(value)
@@ -0,0 +1,97 @@
+"""
+Offline micro-benchmark: the old per-Lambda DecimalEncoder classes vs civicbot_utils.serialization.
+
+Builds synthetic CivicIssues items shaped like boto3 scan output (Decimal numbers, string sets):
+    python -m civicbot_utils.serialization_bench --items 10000 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from civicbot_utils import serialization
+
+
+class StrDecimalEncoder(json.JSONEncoder):
+    """Former admin_get_issues / admin_update_issue / admin_get_stats encoder."""
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return str(o)
+        return super().default(o)
+
+
+class NumberDecimalEncoder(json.JSONEncoder):
+    """Former CivicBotHandler encoder."""
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o == int(o) else float(o)
+        return super().default(o)
+
+
+def make_items(count):
+    statuses = ['New', 'Processing', 'Completed']
+    priorities = ['HIGH', 'MEDIUM', 'LOW']
+    return [
+        {
+            'IssueID': f"{i:08x}",
+            'UserID': f"9198{i % 5000:08d}",
+            'IssueType': 'Streetlight not working near the bus stop',
+            'UserLocation': f"GPS Coordinates: LAT:{12.9 + i % 97 / 1000}|LONG:{77.5 + i % 89 / 1000}",
+            'Status': statuses[i % 3],
+            'StatusShard': f"{statuses[i % 3]}#shard{i % 8}",
+            'Priority': priorities[i % 3],
+            'Timestamp': Decimal(1700000000 + i),
+            'StatusLastModified': Decimal(1700050000 + i),
+            'Rating': Decimal(i % 5 + 1),
+            'Latitude': Decimal(f"{12.9 + i % 97 / 1000:.6f}"),
+            'Tags': {'civic', 'night'} if i % 4 == 0 else {'civic'},
+            'ExpectedCompletionDate': '2025-01-15',
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings), len(output)
+
+
+def run(items_count, repeat):
+    items = make_items(items_count)
+    # The old encoders could not handle sets at all, so they get set-free copies
+    legacy_items = [{k: v for k, v in item.items() if k != 'Tags'} for item in items]
+
+    candidates = {
+        'legacy_str_encoder': lambda: json.dumps(legacy_items, cls=StrDecimalEncoder),
+        'legacy_number_encoder': lambda: json.dumps(legacy_items, cls=NumberDecimalEncoder),
+        'stdlib_json': lambda: serialization._dumps_json(items),
+    }
+    if serialization.orjson is not None:
+        candidates['orjson'] = lambda: serialization.orjson.dumps(items, default=serialization._json_default).decode('utf-8')
+
+    results = {'items': items_count, 'repeat': repeat, 'orjson_available': serialization.orjson is not None}
+    for name, func in candidates.items():
+        best, median, size = best_of(func, repeat)
+        results[name] = {'best_ms': round(best * 1000, 2), 'median_ms': round(median * 1000, 2), 'bytes': size}
+    # Admin endpoints used the str encoder and CivicBotHandler the number encoder: report against both
+    for baseline in ('legacy_str_encoder', 'legacy_number_encoder'):
+        for name in candidates:
+            results[name][f"speedup_vs_{baseline}"] = round(results[baseline]['best_ms'] / results[name]['best_ms'], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DynamoDB item serialization.")
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
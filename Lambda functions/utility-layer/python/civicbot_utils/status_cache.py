@@ -0,0 +1,141 @@
+"""
+Read-through cache for formatted TrackStatus replies.
+
+Two tiers:
+  1. a warm-container LRU whose short TTL (STATUS_CACHE_LOCAL_TTL) is the staleness bound, since
+     other containers cannot be told about updates;
+  2. an optional shared Redis/ElastiCache store (STATUS_CACHE_REDIS_URL) that StatusNotifier
+     invalidates from the CivicIssues DynamoDB stream, with STATUS_CACHE_SHARED_TTL as a backstop.
+
+Each issue also has a generation counter in the shared store. invalidate() bumps it, and a reader
+only fills the shared tier if the generation is unchanged since before its DynamoDB read, so a
+reply loaded from the old item cannot be written back after the invalidation.
+"""
+import collections
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger()
+
+# --- CONFIGURATION ---
+LOCAL_TTL_SECONDS = float(os.environ.get('STATUS_CACHE_LOCAL_TTL', '15'))
+SHARED_TTL_SECONDS = int(os.environ.get('STATUS_CACHE_SHARED_TTL', '300'))
+LOCAL_MAX_ENTRIES = int(os.environ.get('STATUS_CACHE_MAX_ENTRIES', '5000'))
+REDIS_URL = os.environ.get('STATUS_CACHE_REDIS_URL')
+KEY_PREFIX = 'civicbot:status:'
+GENERATION_PREFIX = 'civicbot:status-gen:'
+GENERATION_TTL_SECONDS = 86400 # Only has to outlive an in-flight load
+
+# SET the reply only if the issue's generation is still the one read before loading it
+_SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_local = collections.OrderedDict()  # issue_id -> (expires_at, message)
+_lock = threading.Lock()
+_shared_client = None
+
+
+def _shared_store():
+    """Lazily connects to the shared store; returns None when it is not configured or unavailable."""
+    global _shared_client
+    if not REDIS_URL:
+        return None
+    if _shared_client is None:
+        try:
+            import redis # Optional: pip install redis -t python/ in the utility layer
+            _shared_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.05, socket_connect_timeout=0.2)
+        except ImportError:
+            logger.warning("STATUS_CACHE_REDIS_URL is set but the redis package is not installed.")
+            return None
+    return _shared_client
+
+
+def _local_get(issue_id, now):
+    with _lock:
+        entry = _local.get(issue_id)
+        if not entry:
+            return None
+        if entry[0] <= now:
+            del _local[issue_id]
+            return None
+        _local.move_to_end(issue_id)
+        return entry[1]
+
+
+def _local_put(issue_id, message, now):
+    with _lock:
+        _local[issue_id] = (now + LOCAL_TTL_SECONDS, message)
+        _local.move_to_end(issue_id)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def get_status_message(issue_id, loader):
+    """
+    Returns the cached status reply for `issue_id`, calling `loader(issue_id)` on a miss.
+    The loader returns the formatted message, or None if the issue does not exist (not cached).
+    """
+    now = time.time()
+    message = _local_get(issue_id, now)
+    if message is not None:
+        return message
+
+    store = _shared_store()
+    generation = None
+    if store is not None:
+        try:
+            cached, generation = store.mget(KEY_PREFIX + issue_id, GENERATION_PREFIX + issue_id)
+            if cached is not None:
+                message = cached.decode('utf-8')
+                _local_put(issue_id, message, now)
+                return message
+            generation = (generation or b'').decode('utf-8')
+        except Exception as e:
+            logger.warning(f"Status cache read failed, falling back to DynamoDB: {e}")
+            store = None # Without a generation we cannot safely fill the shared tier
+
+    message = loader(issue_id)
+    if message is None:
+        return None
+
+    _local_put(issue_id, message, now)
+    if store is not None:
+        try:
+            store.eval(
+                _SET_IF_GENERATION, 2, KEY_PREFIX + issue_id, GENERATION_PREFIX + issue_id,
+                generation, message.encode('utf-8'), SHARED_TTL_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Status cache write failed: {e}")
+    return message
+
+
+def invalidate(issue_ids):
+    """Drops cached replies for the given issues (called from the DynamoDB stream consumer)."""
+    issue_ids = [i for i in issue_ids if i]
+    if not issue_ids:
+        return
+    with _lock:
+        for issue_id in issue_ids:
+            _local.pop(issue_id, None)
+
+    store = _shared_store()
+    if store is not None:
+        try:
+            pipeline = store.pipeline(transaction=False)
+            for issue_id in issue_ids:
+                pipeline.incr(GENERATION_PREFIX + issue_id)
+                pipeline.expire(GENERATION_PREFIX + issue_id, GENERATION_TTL_SECONDS)
+            pipeline.delete(*[KEY_PREFIX + i for i in issue_ids])
+            pipeline.execute()
+        except Exception as e:
+            # Raise so the stream batch is retried; StatusNotifier invalidates before sending anything
+            logger.error(f"Status cache invalidation failed: {e}")
+            raise
@@ -0,0 +1,29 @@
+"""
+Write-sharded status key for the StatusShard-Timestamp-index GSI.
+
+Status has only three values (New, Processing, Completed), so a GSI keyed on it puts every open
+issue on one hot partition. Items also carry StatusShard = "<Status>#shard<N>", where N is a
+stable hash of the IssueID. Writers (handle_report_issue, admin_update_issue) set it next to
+Status; admin_get_issues queries every shard in parallel and merges by Timestamp.
+
+STATUS_SHARD_COUNT must be identical for every Lambda. Changing it requires re-running
+backfill_status_shards.
+"""
+import os
+import zlib
+
+STATUS_SHARD_COUNT = int(os.environ.get('STATUS_SHARD_COUNT', '8'))
+STATUS_SHARD_INDEX = os.environ.get('STATUS_SHARD_INDEX', 'StatusShard-Timestamp-index')
+
+
+def shard_for_issue(issue_id, shard_count=STATUS_SHARD_COUNT):
+    # crc32 rather than hash(): it must be the same in every process
+    return zlib.crc32(issue_id.encode('utf-8')) % shard_count
+
+
+def status_shard_key(status, issue_id, shard_count=STATUS_SHARD_COUNT):
+    return f"{status}#shard{shard_for_issue(issue_id, shard_count)}"
+
+
+def all_status_shard_keys(status, shard_count=STATUS_SHARD_COUNT):
+    return [f"{status}#shard{n}" for n in range(shard_count)]